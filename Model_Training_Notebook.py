@@ -30,94 +30,30 @@ from sklearn.metrics import roc_auc_score, roc_curve, accuracy_score, precision_
 import os
 from datetime import datetime
 from sklearn.metrics import ConfusionMatrixDisplay
-
-data = pd.read_csv('cumulative.csv')
-data.head(5)
-
-def preprocess_inputs(df):
-    df = df.copy()
-
-    # Drop unused columns
-    df = df.drop(['rowid', 'kepid', 'kepoi_name', 'kepler_name',
-                  'koi_pdisposition', 'koi_score', 'koi_tce_delivname',
-                 'koi_fpflag_nt','koi_fpflag_ss','koi_fpflag_co','koi_fpflag_ec',
-                 'koi_tce_plnt_num'], axis=1) # the last 4 columns are removed because after scaling they are almost 0
-
-    # Limit target values to CANDIDATE and CONFIRMED
-    false_positive_rows = df.query("koi_disposition == 'FALSE POSITIVE'").index
-    df = df.drop(false_positive_rows, axis=0).reset_index(drop=True)
-
-    # Drop columns with all missing values
-    df = df.drop(['koi_teq_err1', 'koi_teq_err2'], axis=1)
-
-    # Identify numeric columns
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    if 'koi_disposition' in numeric_cols:
-        numeric_cols.remove('koi_disposition')
-
-    # Handle outliers using IQR
-    for col in numeric_cols:
-        if df[col].notna().sum() > 0:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 3 * IQR  # Using 3*IQR for less aggressive outlier removal
-            upper_bound = Q3 + 3 * IQR
-            df[col] = df[col].clip(lower=lower_bound, upper=upper_bound)
-
-    # Fill missing values with median as its more robust than mean
-    for column in df.columns[df.isna().sum() > 0]:
-        df[column] = df[column].fillna(df[column].median())
-
-    # Feature engineering - create interaction features
-    # Transit depth to stellar radius ratio
-    if 'koi_depth' in df.columns and 'koi_srad' in df.columns:
-        df['depth_to_srad'] = df['koi_depth'] / (df['koi_srad'] + 1e-10)
-
-    # Planet-star radius ratio
-    if 'koi_prad' in df.columns and 'koi_srad' in df.columns:
-        df['prad_to_srad_ratio'] = df['koi_prad'] / (df['koi_srad'] + 1e-10)
-
-    # Orbital period to impact parameter ratio
-    if 'koi_period' in df.columns and 'koi_impact' in df.columns:
-        df['period_to_impact'] = df['koi_period'] / (df['koi_impact'] + 1e-10)
-
-    # Insolation flux feature
-    if 'koi_insol' in df.columns:
-        df['log_insol'] = np.log1p(df['koi_insol'])
-
-    # Signal-to-noise ratio features
-    if 'koi_model_snr' in df.columns:
-        df['log_snr'] = np.log1p(df['koi_model_snr'])
-
-    # Remove highly correlated features (> 0.95 correlation) to eliminate multicollinearity
-    numeric_df = df.select_dtypes(include=[np.number])
-    corr_matrix = numeric_df.corr().abs()
-    upper_tri = corr_matrix.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
-    to_drop = [column for column in upper_tri.columns if any(upper_tri[column] > 0.95)]
-    df = df.drop(to_drop, axis=1)
-
-    # Split df into X and y
-    y = df['koi_disposition']
-    X = df.drop('koi_disposition', axis=1)
-
-    # Train-test split with stratification
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, train_size=0.7, shuffle=True, random_state=1, stratify=y
+from data_cache import load_training_data
+from drift import DriftMonitor
+from evaluation import cross_validate_cv, cv_folds, evaluate_models, learning_curve_cv
+from knn_index import KNNIndexClassifier
+from training import apply_best_params, train_models_parallel
+
+def preprocess_inputs(path):
+    # Drop false positives, clip outliers at 3*IQR, fill missing values with medians, add
+    # interaction features, remove > 0.95 correlated features, split and scale (see preprocessing.py).
+    # The CSV is parsed through a columnar, memory-mapped cache and the result is
+    # cached by the hash of the CSV and these parameters (see data_cache.py)
+    X_train, X_test, y_train, y_test, preprocessor = load_training_data(
+        path, iqr_factor=3, corr_threshold=0.95, train_size=0.7, random_state=1
     )
 
-    # Normalizing features
-    scaler = RobustScaler()
-    scaler.fit(X_train)
-    joblib.dump(scaler, 'scaler.pkl')
-    X_train = pd.DataFrame(scaler.transform(X_train),
-                          index=X_train.index, columns=X_train.columns)
-    X_test = pd.DataFrame(scaler.transform(X_test),
-                         index=X_test.index, columns=X_test.columns)
+    joblib.dump(preprocessor.scaler, 'scaler.pkl')
+    # Persist every fitted statistic so raw catalog rows can be transformed later
+    preprocessor.save('preprocessor.pkl')
+    # Quantile-bin histograms of the training inputs, the reference of drift.py
+    DriftMonitor.from_training(X_train).save_reference('drift_reference.json')
 
     return X_train, X_test, y_train, y_test
 
-X_train, X_test, y_train, y_test = preprocess_inputs(data)
+X_train, X_test, y_train, y_test = preprocess_inputs('cumulative.csv')
 
 print(f"Training set shape: {X_train.shape}")
 print(f"Test set shape: {X_test.shape}")
@@ -141,45 +77,46 @@ models = {
     "     SGD Classifier": SGDClassifier(loss="log_loss"),
     " Naive Bayes (Gauss)": GaussianNB(),
     " Naive Bayes (Bern)": BernoulliNB(),
-    "k-Nearest Neighbors": KNeighborsClassifier(),
+    "k-Nearest Neighbors": KNNIndexClassifier(n_neighbors=5, algorithm="kd_tree"),
     "                 LDA": LinearDiscriminantAnalysis(),
     "                 QDA": QuadraticDiscriminantAnalysis(),
     " Neural Net (MLP)": MLPClassifier(max_iter=500)
 }
 
-for name, model in models.items():
-    model.fit(X_train, y_train)
-    print(f"{name} trained.")
-    filename = name.strip().replace(" ", "_").lower() + ".pkl"
-    joblib.dump(model, filename)
-    print(f"Saved {name} to {filename}")
+# Use the configurations found by hyperparameter_search.py where available
+models = apply_best_params(models)
+
+# Train the independent models concurrently, one process per model; each is
+# saved to its .pkl as soon as its fit finishes. Models whose data, parameters
+# and library versions are unchanged since the last run are loaded instead
+models, retrained = train_models_parallel(models, X_train, y_train)
+
+# Metrics of unchanged models are reused from the previous run
+models_dir = os.getcwd()
+results_path = os.path.join(models_dir, "model_results.csv")
+previous_results = pd.read_csv(results_path) if os.path.exists(results_path) else pd.DataFrame(columns=["Model"])
 
 # Evaluation
 results = []
 plt.figure(figsize=(10, 8))
 
+to_evaluate = {}
 for name, model in models.items():
-    y_pred = model.predict(X_test)
-    y_pred_proba = model.predict_proba(X_test)[:, 1]
-
-    # Use sklearn's built-in metrics
-    acc = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, pos_label='CONFIRMED', zero_division=0)
-    recall = recall_score(y_test, y_pred, pos_label='CONFIRMED', zero_division=0)
-    f1 = f1_score(y_test, y_pred, pos_label='CONFIRMED', zero_division=0)
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
-
-    results.append({
-        "Model": name,
-        "Accuracy": acc,
-        "Precision": precision,
-        "Recall": recall,
-        "F1 Score": f1,
-        "ROC-AUC": roc_auc
-    })
-
-    fpr, tpr, _ = roc_curve(y_test, y_pred_proba, pos_label='CONFIRMED')
-    plt.plot(fpr, tpr, label=f"{name} (AUC={roc_auc:.3f})")
+    stored = previous_results[previous_results["Model"] == name]
+    if name not in retrained and len(stored):
+        results.append(stored.iloc[0].to_dict())
+        print(f"{name.strip()}: unchanged, reusing stored metrics (not plotted)")
+    else:
+        to_evaluate[name] = model
+
+# One predict_proba per model, all metrics and the ROC curve from one sorted
+# pass over its scores; the models are scored concurrently. verify=True checks
+# every model's metrics against sklearn's on the test split
+for name, metrics, fpr, tpr, elapsed in evaluate_models(to_evaluate, X_test, y_test, pos_label='CONFIRMED',
+                                                        verify=True):
+    results.append(metrics)
+    print(f"{name.strip()} evaluated in {elapsed:.2f}s.")
+    plt.plot(fpr, tpr, label=f"{name} (AUC={metrics['ROC-AUC']:.3f})")
 
 plt.plot([0, 1], [0, 1], 'k--', label='Random Chance')
 plt.xlabel("False Positive Rate")
@@ -197,8 +134,6 @@ print(df_results.to_string(index=False))
 print("="*80)
 
 # Save results to CSV
-models_dir = os.getcwd()
-results_path = os.path.join(models_dir, "model_results.csv")
 df_results.to_csv(results_path, index=False)
 
 # Save a README file with usage instructions
@@ -231,31 +166,30 @@ with open(readme_path, 'w') as f:
 
 # Find and display best model
 best_model = df_results.iloc[0]
+best_model_name = best_model['Model']
 print(f"\n{'='*80}")
 print(f"BEST MODEL: {best_model['Model']}")
 print(f"ROC-AUC: {best_model['ROC-AUC']:.4f}")
 print(f"F1 Score: {best_model['F1 Score']:.4f}")
 print(f"{'='*80}")
 
-from sklearn.model_selection import cross_val_score
-
+# Cross-validation and learning curve share one set of stratified folds. The
+# CV scores are cold fits of the best model; the learning curve is cheaper and
+# approximate: boosted models stop early on a split held out of each training
+# prefix and warm-startable models reuse the fit on the previous size
 best_clf = models[best_model["Model"]]
-cv_scores = cross_val_score(best_clf, X_train, y_train, cv=5, scoring="roc_auc")
+folds = cv_folds(X_train, y_train, cv=5)
+cv_scores = cross_validate_cv(best_clf, X_train, y_train, folds)
 
 print("Cross-Validation ROC-AUC scores:", cv_scores)
 print("Mean ROC-AUC:", cv_scores.mean())
 print("Std deviation:", cv_scores.std())
 
-from sklearn.model_selection import learning_curve
-
-# === Learning Curve for Best Model ===
-train_sizes, train_scores, val_scores = learning_curve(
+train_sizes, train_scores, val_scores = learning_curve_cv(
     best_clf,
     X_train,
     y_train,
-    cv=5,
-    scoring="roc_auc",
-    n_jobs=-1,
+    folds,
     train_sizes=np.linspace(0.1, 1.0, 10)  # 10 points from 10% to 100% of data
 )
 
@@ -289,8 +223,3 @@ plt.title(f"Learning Curve - {best_model_name}")
 plt.legend(loc="best")
 plt.grid(True)
 plt.show()
-
-
-
-
-
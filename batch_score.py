@@ -0,0 +1,157 @@
+# Headless batch scorer for raw KOI catalogs (same schema as cumulative.csv)
+#
+# Usage:
+#   python batch_score.py cumulative.csv -o predictions.csv --model catboost.pkl --workers 8
+#   python batch_score.py cumulative.csv --model lightgbm.pkl --shap   # add shap_<feature> columns
+#   python batch_score.py cumulative.csv --uncertainty-draws 200       # probability intervals from err1/err2
+#   python batch_score.py cumulative.csv --drift-report drift.csv      # PSI/KS of the inputs vs training
+import argparse
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from attribution import supports_tree_shap, tree_shap
+from drift import REFERENCE_PATH, DriftMonitor
+from model_artifacts import find_model_file, load_model_file, limit_model_threads
+from preprocessing import FEATURE_NAMES, ID_COLUMNS, load_feature_transform
+from uncertainty import propagate_catalog
+
+# Per-process state, filled once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, preprocessor_path, scaler_path, shap=False, draws=0, seed=None, drift=None):
+    model, feature_names = load_model_file(model_path)
+    _worker["model"] = limit_model_threads(model, 1)
+    with warnings.catch_warnings():
+        # A missing preprocessor is reported once by score_catalog, not by every worker
+        warnings.simplefilter("ignore", RuntimeWarning)
+        _worker["transform"] = load_feature_transform(preprocessor_path, scaler_path)
+    _worker["feature_names"] = feature_names or FEATURE_NAMES
+    _worker["shap"] = shap
+    _worker["draws"] = draws
+    _worker["seed"] = seed
+    _worker["drift"] = drift
+
+
+def _score_chunk(chunk):
+    model = _worker["model"]
+    X = _worker["transform"](chunk).reindex(columns=_worker["feature_names"], fill_value=0)
+    proba = model.predict_proba(X)
+    classes = np.asarray(model.classes_, dtype=object)
+
+    out = chunk[[c for c in ID_COLUMNS if c in chunk.columns]].copy()
+    out["prediction"] = classes[proba.argmax(axis=1)]
+    for idx, cls in enumerate(classes):
+        out[f"prob_{cls}"] = proba[:, idx]
+    if _worker["shap"]:
+        contributions, base_values = tree_shap(model, X)
+        out["shap_base"] = base_values
+        for idx, name in enumerate(_worker["feature_names"]):
+            out[f"shap_{name}"] = contributions[:, idx]
+    if _worker["draws"]:
+        # Seeded per chunk, so results do not depend on which worker ran it
+        seed = None if _worker["seed"] is None else [_worker["seed"], int(chunk.index[0])]
+        intervals = propagate_catalog(model, _worker["transform"], chunk, _worker["feature_names"],
+                                      draws=_worker["draws"], seed=seed)
+        for column, values in intervals.items():
+            out[f"prob_{classes[1]}_{column}"] = values
+    # The chunk's input histograms go back with its results and are summed by the parent.
+    # They count the inputs before imputation, so missing values show up as missing.
+    drift = _worker["drift"]
+    if drift is not None:
+        drift.reset()
+        drift.update(_worker["transform"](chunk, impute=False).reindex(columns=_worker["feature_names"]))
+    return out, drift
+
+
+def score_catalog(input_path, output_path, model_path, preprocessor_path="preprocessor.pkl",
+                  scaler_path="scaler.pkl", chunk_size=100_000, workers=None, shap=False, draws=0, seed=None,
+                  drift_monitor=None):
+    """Stream input_path through the model in chunk_size rows and append results to output_path.
+
+    At most 2 * workers chunks are in flight, so memory is bounded by the chunk
+    size rather than the catalog size. Output rows keep the input order. With
+    shap, the tree SHAP attribution of every feature (log-odds of the second
+    class) is added as shap_<feature> columns plus shap_base. With draws > 0,
+    each row's measurement errors are propagated with that many Monte Carlo
+    draws (see uncertainty.py) into prob_<class>_{mean,std,p05,p50,p95}.
+    The model inputs of every row are counted into drift_monitor, a
+    DriftMonitor over the training reference, when one is given.
+    """
+    if not os.path.exists(preprocessor_path):
+        print(f"Warning: {preprocessor_path} not found; raw rows are only scaled with {scaler_path}, without the "
+              f"training outlier clipping and median imputation", file=sys.stderr)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    n_rows = 0
+    header = True
+
+    def write(scored):
+        nonlocal n_rows, header
+        result, drift = scored
+        if drift is not None:
+            drift_monitor.merge(drift)
+        result.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        n_rows += len(result)
+
+    reader = pd.read_csv(input_path, chunksize=chunk_size)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, preprocessor_path, scaler_path, shap, draws, seed,
+                                       drift_monitor)) as pool:
+        pending = deque()
+        for chunk in reader:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a raw KOI catalog without the Streamlit app.")
+    parser.add_argument("input", help="CSV catalog with the cumulative.csv schema")
+    parser.add_argument("-o", "--output", default="predictions.csv", help="CSV file to write")
+    parser.add_argument("--model", default=None, help="Model pickle (default: first of the app's candidates)")
+    parser.add_argument("--preprocessor", default="preprocessor.pkl", help="Fitted preprocessing pipeline")
+    parser.add_argument("--scaler", default="scaler.pkl", help="Fitted scaler, used when the preprocessor is missing")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--shap", action="store_true", help="Add tree SHAP attributions (CatBoost/LightGBM only)")
+    parser.add_argument("--uncertainty-draws", type=int, default=0,
+                        help="Monte Carlo draws per row within the err1/err2 error bars (0 = off)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the uncertainty draws")
+    parser.add_argument("--drift-report", default=None, help="Write a PSI/KS input drift report to this CSV")
+    parser.add_argument("--drift-reference", default=REFERENCE_PATH, help="Reference exported by the training script")
+    args = parser.parse_args(argv)
+
+    model_path = args.model or find_model_file()
+    if model_path is None:
+        parser.error("no model file found; pass --model")
+    if args.shap and not supports_tree_shap(load_model_file(model_path)[0]):
+        parser.error(f"{model_path} has no native tree SHAP; use a CatBoost or LightGBM model")
+
+    drift_monitor = DriftMonitor.load_reference(args.drift_reference) if args.drift_report else None
+    started = time.perf_counter()
+    n_rows = score_catalog(args.input, args.output, model_path, args.preprocessor, args.scaler,
+                           chunk_size=args.chunk_size, workers=args.workers, shap=args.shap,
+                           draws=args.uncertainty_draws, seed=args.seed, drift_monitor=drift_monitor)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {n_rows} rows with {model_path} in {elapsed:.1f}s -> {args.output}")
+    if drift_monitor is not None:
+        report = drift_monitor.report()
+        report.to_csv(args.drift_report, index=False)
+        drifted = report[report["status"] == "major"]["feature"].tolist()
+        print(f"Drift report -> {args.drift_report}; major shift in: {', '.join(drifted) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
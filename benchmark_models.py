@@ -0,0 +1,163 @@
+# Benchmark every shipped model pickle: cold load time, resident memory,
+# single-row latency and batch throughput.
+#
+# Usage:
+#   python benchmark_models.py -o benchmark_results.json
+#   python benchmark_models.py --baseline benchmark_baseline.json --tolerance 0.25
+#
+# Each model is measured in a fresh process so load time and memory are not
+# polluted by the other models. The pickle and, when one was exported, the
+# native artifact from artifacts/ (see model_artifacts.py) are benchmarked as
+# separate entries keyed by the file that was loaded. With --baseline the run
+# exits non-zero when any metric regresses by more than the tolerance, or when
+# a model or metric of the baseline is missing from the run.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+from model_artifacts import list_model_files, native_artifact_path
+
+# Metrics where a larger value is better; everything else is lower-is-better
+HIGHER_IS_BETTER = {"rows_per_s_1k", "rows_per_s_100k"}
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _measure(path, n_latency, batch_sizes, seed):
+    from model_artifacts import load_model_file, load_native_artifact
+    from predictor import Predictor, ignore_feature_names_warning
+    from preprocessing import FEATURE_NAMES
+
+    ignore_feature_names_warning()
+
+    # Import the model libraries up front so they don't count as model load
+    import sklearn, lightgbm, catboost  # noqa: F401
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    if path.endswith(".pkl"):
+        model, feature_names = load_model_file(path, prefer_native=False)
+    else:
+        model, feature_names = load_native_artifact(path), None
+    load_s = time.perf_counter() - started
+    rss_mb = _rss_mb() - rss_before
+
+    predictor = Predictor(model, feature_names or FEATURE_NAMES)
+    rng = np.random.default_rng(seed)
+    n_features = len(predictor.feature_names)
+
+    rows = rng.standard_normal((n_latency, n_features))
+    predictor.predict(rows[0])  # warm-up
+    latencies = np.empty(n_latency)
+    for i in range(n_latency):
+        started = time.perf_counter()
+        predictor.predict(rows[i])
+        latencies[i] = time.perf_counter() - started
+
+    result = {
+        "load_s": load_s,
+        "rss_mb": rss_mb,
+        "file_mb": os.path.getsize(path) / 2**20,
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+    }
+    for n_rows in batch_sizes:
+        X = rng.standard_normal((n_rows, n_features))
+        started = time.perf_counter()
+        predictor.predict_many(X)
+        result[f"rows_per_s_{n_rows // 1000}k"] = n_rows / (time.perf_counter() - started)
+    return result
+
+
+def run_benchmarks(paths, n_latency=500, batch_sizes=(1_000, 100_000), seed=0, native=True):
+    """Benchmark each pickle, plus its up-to-date native artifact when native is set."""
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    if native:
+        paths = [p for path in paths for p in (path, native_artifact_path(path)) if p is not None]
+    for path in paths:
+        with ctx.Pool(1) as pool:
+            metrics = pool.apply(_measure, (path, n_latency, batch_sizes, seed))
+        results[os.path.basename(path)] = metrics
+        print(f"{path}: " + ", ".join(f"{k}={v:.4g}" for k, v in metrics.items()))
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of human-readable regressions beyond the relative tolerance.
+
+    Models and metrics of the baseline missing from results count as
+    regressions, so a renamed or failed artifact does not pass unnoticed.
+    """
+    regressions = []
+    for model_name, base_metrics in baseline.items():
+        if model_name not in results:
+            regressions.append(f"{model_name}: missing from this run")
+            continue
+        missing = [metric for metric in base_metrics if metric not in results[model_name]]
+        if missing:
+            regressions.append(f"{model_name}: missing metrics {', '.join(missing)}")
+    for model_name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(model_name, {}).get(metric)
+            if not base or metric == "file_mb":
+                continue
+            change = (value - base) / base
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{model_name} {metric}: {base:.4g} -> {value:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the shipped model pickles.")
+    parser.add_argument("models", nargs="*", help="Model pickles (default: every *.pkl in the repo root)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file to write")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--latency-rows", type=int, default=500, help="Single-row predictions to time")
+    parser.add_argument("--no-native", action="store_true", help="Skip the native artifacts in artifacts/")
+    args = parser.parse_args(argv)
+
+    paths = args.models or list_model_files()
+    results = run_benchmarks(paths, n_latency=args.latency_rows, native=not args.no_native)
+
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
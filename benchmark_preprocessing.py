@@ -0,0 +1,111 @@
+# Benchmark the vectorized ExoplanetPreprocessor against the original
+# column-by-column preprocess_inputs on cumulative.csv and on synthetic
+# catalogs 10x-100x larger.
+#
+# Usage:
+#   python benchmark_preprocessing.py --scales 1 10 100
+#
+# The run first checks that both implementations produce the same features on
+# cumulative.csv and exits non-zero if they differ.
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import UNUSED_COLUMNS, ExoplanetPreprocessor, add_engineered_features
+
+
+def legacy_preprocess(df):
+    """The original loop-based clipping, imputation and correlation filter."""
+    df = df.drop(UNUSED_COLUMNS, axis=1)
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+
+    for col in numeric_cols:
+        if df[col].notna().sum() > 0:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            df[col] = df[col].clip(lower=Q1 - 3 * IQR, upper=Q3 + 3 * IQR)
+
+    for column in df.columns[df.isna().sum() > 0]:
+        df[column] = df[column].fillna(df[column].median())
+
+    df = add_engineered_features(df)
+
+    numeric_df = df.select_dtypes(include=[np.number])
+    corr_matrix = numeric_df.corr().abs()
+    upper_tri = corr_matrix.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
+    to_drop = [column for column in upper_tri.columns if any(upper_tri[column] > 0.95)]
+    return df.drop(to_drop, axis=1).drop('koi_disposition', axis=1)
+
+
+def vectorized_preprocess(df):
+    return ExoplanetPreprocessor().fit(df).transform_unscaled(df)
+
+
+def load_catalog(path='cumulative.csv'):
+    df = pd.read_csv(path)
+    return df[df['koi_disposition'] != 'FALSE POSITIVE'].reset_index(drop=True)
+
+
+def synthetic_catalog(df, scale, seed=0):
+    """Resample df to scale times its length, jittering numeric values by ~1%."""
+    rng = np.random.default_rng(seed)
+    sample = df.sample(n=len(df) * scale, replace=True, random_state=seed).reset_index(drop=True)
+    numeric = sample.select_dtypes(include=[np.number]).columns.difference(UNUSED_COLUMNS)
+    sample[numeric] = sample[numeric] * rng.normal(1.0, 0.01, size=(len(sample), len(numeric)))
+    return sample
+
+
+def check_equivalence(df):
+    expected = legacy_preprocess(df)
+    actual = vectorized_preprocess(df)
+    pd.testing.assert_index_equal(actual.columns, expected.columns)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
+
+
+def time_call(func, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing on synthetic catalogs.")
+    parser.add_argument("--catalog", default="cumulative.csv")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size; the best is kept")
+    parser.add_argument("-o", "--output", help="Optional JSON file for the timings")
+    args = parser.parse_args(argv)
+
+    df = load_catalog(args.catalog)
+    try:
+        check_equivalence(df)
+    except AssertionError as e:
+        print(f"Vectorized preprocessing differs from the original on {args.catalog}:\n{e}")
+        sys.exit(1)
+    print(f"Vectorized output matches the original on {args.catalog}")
+
+    rows = []
+    for scale in args.scales:
+        catalog = df if scale == 1 else synthetic_catalog(df, scale)
+        legacy_s = time_call(legacy_preprocess, catalog, args.repeat)
+        vectorized_s = time_call(vectorized_preprocess, catalog, args.repeat)
+        rows.append({"scale": scale, "rows": len(catalog), "legacy_s": legacy_s,
+                     "vectorized_s": vectorized_s, "speedup": legacy_s / vectorized_s})
+        print(f"{scale:>4}x {len(catalog):>9,} rows | legacy {legacy_s:8.3f}s | "
+              f"vectorized {vectorized_s:8.3f}s | {legacy_s / vectorized_s:5.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
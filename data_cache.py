@@ -0,0 +1,192 @@
+# On-disk caches of KOI catalogs and of the preprocessed training data
+#
+# load_catalog parses the CSV once, keeps only the columns the pipeline uses
+# and writes one .npy file per column. Later loads memory-map those arrays
+# instead of re-parsing the text. The cache directory is keyed by the SHA-256
+# of the source file, so editing or replacing the CSV invalidates it; caches
+# of an older version of the file, or of an older CACHE_VERSION, are removed.
+#
+# load_training_data caches the output of prepare_training_data (the scaled
+# train/test split and the fitted preprocessor) under a key derived from the
+# CSV, the preprocessing parameters and the preprocessing code, so model
+# iterations never redo the clipping, imputation, feature engineering,
+# correlation pruning, split and scaler fit. Only the latest split is kept.
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import preprocessing
+from preprocessing import UNUSED_COLUMNS, prepare_training_data
+
+CACHE_DIR = '.catalog_cache'
+# Bump when the on-disk layout or encoding changes
+# 2: float columns are only downcast when float32 holds them exactly
+CACHE_VERSION = 2
+
+FLOAT32_MAX = np.finfo(np.float32).max
+FLOAT32_TINY = np.finfo(np.float32).tiny
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _float32_is_safe(values, max_rel_error=0.0):
+    """True when storing values as float32 neither overflows, underflows nor moves them more than max_rel_error.
+
+    A float32 round trip is never off by more than 2**-24 (~6e-8) relative,
+    so any max_rel_error above that accepts every in-range column. The
+    default of 0 only accepts columns float32 holds exactly (integers, flags,
+    short binary fractions), so cached values equal the CSV's float64 values
+    and training sees what batch_score.py and the app see.
+    """
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return True
+    magnitude = np.abs(finite)
+    nonzero = magnitude[magnitude > 0]
+    if magnitude.max() > FLOAT32_MAX or (nonzero.size and nonzero.min() < FLOAT32_TINY):
+        return False
+    roundtrip = finite.astype(np.float32).astype(np.float64)
+    rel_error = np.abs(roundtrip[magnitude > 0] - finite[magnitude > 0]) / magnitude[magnitude > 0]
+    return rel_error.size == 0 or rel_error.max() <= max_rel_error
+
+
+def _encode_column(series, downcast, max_rel_error):
+    """Return (array, meta) for one column."""
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+        if downcast and _float32_is_safe(values, max_rel_error):
+            values = values.astype(np.float32)
+        return values, {}
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer').to_numpy(), {}
+    # Strings (e.g. koi_disposition) are stored as codes plus their categories
+    categorical = pd.Categorical(series)
+    return categorical.codes, {'categories': categorical.categories.tolist()}
+
+
+def build_cache(path, cache_path, columns=None, downcast=True, max_rel_error=0.0, source_sha256=None):
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if (c in columns if columns is not None else c not in UNUSED_COLUMNS)]
+    df = pd.read_csv(path, usecols=usecols)
+
+    tmp_path = cache_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    meta_columns = []
+    for idx, name in enumerate(usecols):
+        values, meta = _encode_column(df[name], downcast, max_rel_error)
+        np.save(os.path.join(tmp_path, f'{idx}.npy'), values)
+        meta_columns.append({'name': name, 'dtype': str(values.dtype), **meta})
+
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'source': os.path.abspath(path),
+                   'source_sha256': source_sha256 or file_sha256(path), 'n_rows': len(df),
+                   'columns': meta_columns}, f, indent=2)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
+
+
+def _remove_stale(cache_dir, stem, source, source_sha256):
+    """Remove the caches of source built from other contents or by another CACHE_VERSION.
+
+    Caches of the same file and version with other columns or downcasting are
+    kept, so callers asking for different columns don't evict each other.
+    """
+    for entry in os.listdir(cache_dir):
+        entry_path = os.path.join(cache_dir, entry)
+        if not entry.startswith(stem + '-') or not os.path.isdir(entry_path):
+            continue
+        try:
+            with open(os.path.join(entry_path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('source', source) != source:
+            continue
+        if meta.get('version') != CACHE_VERSION or meta.get('source_sha256') != source_sha256:
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+
+def load_columns(path='cumulative.csv', columns=None, downcast=True, cache_dir=CACHE_DIR):
+    """Load a KOI catalog through the columnar cache as {column: array}.
+
+    By default every column outside UNUSED_COLUMNS is kept; pass ``columns`` to
+    choose them explicitly. Float columns are stored as float32 only when
+    every value survives the round trip exactly, integer columns are downcast
+    to the smallest integer type. Numeric columns are read-only memory maps of
+    the cache files; string columns are decoded into object arrays.
+    """
+    source_sha256 = file_sha256(path)
+    key_source = json.dumps([CACHE_VERSION, source_sha256, columns, downcast])
+    key = hashlib.sha256(key_source.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f'{stem}-{key}')
+
+    if not os.path.exists(os.path.join(cache_path, 'meta.json')):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_cache(path, cache_path, columns=columns, downcast=downcast, source_sha256=source_sha256)
+        _remove_stale(cache_dir, stem, os.path.abspath(path), source_sha256)
+
+    with open(os.path.join(cache_path, 'meta.json')) as f:
+        meta = json.load(f)
+    data = {}
+    for idx, column in enumerate(meta['columns']):
+        values = np.load(os.path.join(cache_path, f'{idx}.npy'), mmap_mode='r')
+        if 'categories' in column:
+            categories = np.asarray(column['categories'], dtype=object)
+            values = np.where(values >= 0, categories[np.maximum(values, 0)], None)
+        data[column['name']] = values
+    return data
+
+
+def load_catalog(path='cumulative.csv', columns=None, downcast=True, cache_dir=CACHE_DIR):
+    """load_columns as a DataFrame whose numeric columns are the memory-mapped arrays.
+
+    With copy=False pandas (2.0 and later) keeps every array as its own block
+    instead of consolidating same-dtype columns into one copied 2-D block.
+    """
+    return pd.DataFrame(load_columns(path, columns, downcast, cache_dir), copy=False)
+
+
+def training_data_key(path='cumulative.csv', iqr_factor=3, corr_threshold=0.95, train_size=0.7, random_state=1):
+    """Content hash identifying the preprocessed training data for a catalog and parameters."""
+    params = {'iqr_factor': iqr_factor, 'corr_threshold': corr_threshold,
+              'train_size': train_size, 'random_state': random_state}
+    key_source = json.dumps([CACHE_VERSION, file_sha256(path), params, file_sha256(preprocessing.__file__)],
+                            sort_keys=True)
+    return hashlib.sha256(key_source.encode()).hexdigest()[:16]
+
+
+def load_training_data(path='cumulative.csv', iqr_factor=3, corr_threshold=0.95, train_size=0.7,
+                       random_state=1, cache_dir=CACHE_DIR):
+    """prepare_training_data on the catalog at path, cached on disk by content.
+
+    Returns X_train, X_test, y_train, y_test and the fitted preprocessor.
+    """
+    key = training_data_key(path, iqr_factor, corr_threshold, train_size, random_state)
+    cache_path = os.path.join(cache_dir, f'splits-{key}.joblib')
+    if os.path.exists(cache_path):
+        return joblib.load(cache_path)
+
+    result = prepare_training_data(load_catalog(path, cache_dir=cache_dir), iqr_factor=iqr_factor,
+                                   corr_threshold=corr_threshold, train_size=train_size,
+                                   random_state=random_state)
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(result, cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+    # Splits of other parameters or preprocessing code would otherwise pile up
+    for entry in os.listdir(cache_dir):
+        if entry.startswith('splits-') and entry.endswith('.joblib') and entry != os.path.basename(cache_path):
+            os.remove(os.path.join(cache_dir, entry))
+    return result
@@ -0,0 +1,227 @@
+# Constant-memory input drift monitoring against the training distribution
+#
+# The training script exports drift_reference.json: per feature, the edges of
+# quantile bins of the (scaled) training inputs and the training share of each
+# bin. A DriftMonitor built from it counts every scored row into the same
+# bins, so its memory is n_features x n_bins integers however many rows it
+# sees, and an update is a couple of vectorized numpy calls per batch. The
+# report compares the counts to the reference with the population stability
+# index (PSI) and the Kolmogorov-Smirnov distance at bin resolution.
+#
+# share() moves the counts into anonymous shared memory before a server forks
+# its workers (see prefork_server.py). Each worker counts into its own slot of
+# it and reports sum all slots, so no lock is held across processes and a
+# worker killed mid-update cannot block the others.
+#
+# Usage:
+#   python drift.py scaled_inputs.csv --reference drift_reference.json
+#   python batch_score.py cumulative.csv --drift-report drift_report.csv
+import argparse
+import json
+import mmap
+import threading
+
+import numpy as np
+import pandas as pd
+
+REFERENCE_PATH = "drift_reference.json"
+
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate shift, above major shift
+PSI_THRESHOLDS = (0.1, 0.25)
+
+# Batches up to this many rows are binned with one broadcast comparison
+BROADCAST_MAX_ROWS = 1024
+
+
+class DriftMonitor:
+    """Streaming per-feature histograms over fixed reference bins.
+
+    edges is n_features x (n_bins - 1) inner bin edges, padded with +inf for
+    features with fewer distinct quantiles; reference holds the training
+    share of each bin. update() is thread-safe; after share(), each process
+    counts into its own slot (see use_slot).
+    """
+
+    def __init__(self, feature_names, edges, reference):
+        self.feature_names = list(feature_names)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.reference = np.asarray(reference, dtype=np.float64)
+        n_features, n_bins = self.reference.shape
+        self.counts = np.zeros((n_features, n_bins), dtype=np.int64)
+        self.missing = np.zeros(n_features, dtype=np.int64)
+        self._n_rows = np.zeros(1, dtype=np.int64)
+        self._slots = None
+        self._offsets = np.arange(n_features) * n_bins
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_training(cls, X, n_bins=20):
+        """Reference bins at the quantiles of training inputs X (a DataFrame)."""
+        values = X.to_numpy(dtype=np.float64)
+        inner = np.nanquantile(values, np.linspace(0, 1, n_bins + 1)[1:-1], axis=0).T
+        edges = np.full_like(inner, np.inf)
+        for j, column_edges in enumerate(inner):
+            unique = np.unique(column_edges[np.isfinite(column_edges)])
+            edges[j, :len(unique)] = unique
+        monitor = cls(X.columns, edges, np.zeros((values.shape[1], n_bins)))
+        monitor.update(values)
+        monitor.reference = monitor.counts / np.maximum(monitor.counts.sum(axis=1, keepdims=True), 1)
+        monitor.reset()
+        return monitor
+
+    @property
+    def n_rows(self):
+        if self._slots is not None:
+            return int(self._slots[:, -1].sum())
+        return int(self._n_rows[0])
+
+    def __getstate__(self):
+        # Monitors travel back from batch workers; locks and the shared mapping
+        # don't pickle, so the arrays travel as copies of this process's counts
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state.pop("_buffer", None)
+        state["_slots"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def share(self, n_slots):
+        """Keep the counts in n_slots slots of memory shared with processes forked after this call.
+
+        The current counts go to slot 0, which this process keeps counting
+        into; every forked process picks its own slot with use_slot().
+        """
+        n_counts = self.counts.size
+        self._buffer = mmap.mmap(-1, n_slots * (n_counts + len(self.missing) + 1) * 8)
+        self._slots = np.frombuffer(self._buffer, dtype=np.int64).reshape(n_slots, -1)
+        self._slots[0, :n_counts] = self.counts.ravel()
+        self._slots[0, n_counts:-1] = self.missing
+        self._slots[0, -1] = self._n_rows[0]
+        return self.use_slot(0)
+
+    def use_slot(self, slot):
+        """Count this process's updates into slot of the shared memory (see share)."""
+        n_counts = self.counts.size
+        row = self._slots[slot]
+        self.counts = row[:n_counts].reshape(self.counts.shape)
+        self.missing = row[n_counts:-1]
+        self._n_rows = row[-1:]
+        # A lock inherited through fork may have been held by another thread of the parent
+        self._lock = threading.Lock()
+        return self
+
+    def snapshot(self):
+        """Copy of the current counts, for report(since=...).
+
+        A shared monitor sums the slots of all processes; they are read while
+        other processes may be updating, so the sums can be off by the rows of
+        batches in progress.
+        """
+        if self._slots is not None:
+            n_counts = self.counts.size
+            total = self._slots.sum(axis=0)
+            return total[:n_counts].reshape(self.counts.shape), total[n_counts:-1], int(total[-1])
+        with self._lock:
+            return self.counts.copy(), self.missing.copy(), self.n_rows
+
+    def reset(self):
+        """Zero the counts; a shared monitor zeroes only this process's slot."""
+        with self._lock:
+            self.counts[:] = 0
+            self.missing[:] = 0
+            self._n_rows[:] = 0
+
+    def _bin(self, X):
+        """Bin index of every value of X, as offsets into the flattened counts."""
+        if len(X) <= BROADCAST_MAX_ROWS:
+            bins = (X[:, :, None] >= self.edges[None]).sum(axis=2)
+        else:
+            bins = np.empty(X.shape, dtype=np.int64)
+            for j in range(X.shape[1]):
+                bins[:, j] = np.searchsorted(self.edges[j], X[:, j], side="right")
+        return bins + self._offsets
+
+    def update(self, X):
+        """Count a batch of scored rows (2-D array or DataFrame in feature_names order)."""
+        if isinstance(X, pd.DataFrame):
+            X = X.reindex(columns=self.feature_names).to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        nan = np.isnan(X)
+        flat = self._bin(X)[~nan]
+        counts = np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+        with self._lock:
+            self.counts += counts
+            self.missing += nan.sum(axis=0)
+            self._n_rows += len(X)
+
+    def merge(self, other):
+        """Add the counts of another monitor over the same reference (e.g. from a worker)."""
+        with self._lock:
+            self.counts += other.counts
+            self.missing += other.missing
+            self._n_rows += other.n_rows
+        return self
+
+    def report(self, eps=1e-4, since=None):
+        """PSI and KS distance of every feature against the reference, worst first.
+
+        With since, a snapshot() taken earlier, only the rows counted after it
+        are compared.
+        """
+        counts, missing, n_rows = self.snapshot()
+        if since is not None:
+            counts, missing, n_rows = counts - since[0], missing - since[1], n_rows - since[2]
+        observed = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        expected = self.reference
+        p, q = np.maximum(observed, eps), np.maximum(expected, eps)
+        # Bins empty in both (padding of features with few distinct values) add nothing
+        used = (observed > 0) | (expected > 0)
+        psi = np.where(used, (p - q) * np.log(p / q), 0.0).sum(axis=1)
+        ks = np.abs(np.cumsum(observed, axis=1) - np.cumsum(expected, axis=1)).max(axis=1)
+        status = np.select([psi < PSI_THRESHOLDS[0], psi < PSI_THRESHOLDS[1]], ["stable", "moderate"], "major")
+        report = pd.DataFrame({"feature": self.feature_names, "psi": psi, "ks": ks,
+                               "rows": counts.sum(axis=1), "missing": missing, "status": status})
+        report.loc[report["rows"] == 0, ["psi", "ks", "status"]] = [np.nan, np.nan, "no data"]
+        report.attrs["n_rows"] = n_rows
+        return report.sort_values("psi", ascending=False, na_position="last").reset_index(drop=True)
+
+    def save_reference(self, path=REFERENCE_PATH):
+        edges = [[e for e in row if np.isfinite(e)] for row in self.edges]
+        with open(path, "w") as f:
+            json.dump({"features": self.feature_names, "edges": edges, "reference": self.reference.tolist()}, f)
+
+    @classmethod
+    def load_reference(cls, path=REFERENCE_PATH):
+        """A fresh monitor (no counts) over the reference bins saved by save_reference."""
+        with open(path) as f:
+            saved = json.load(f)
+        n_bins = len(saved["reference"][0])
+        edges = np.full((len(saved["features"]), n_bins - 1), np.inf)
+        for j, row in enumerate(saved["edges"]):
+            edges[j, :len(row)] = row
+        return cls(saved["features"], edges, saved["reference"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drift report of scaled model inputs against the training data.")
+    parser.add_argument("input", help="CSV of scaled model inputs (one column per feature)")
+    parser.add_argument("--reference", default=REFERENCE_PATH, help="Reference exported by the training script")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("-o", "--output", default=None, help="Write the report to this CSV")
+    args = parser.parse_args(argv)
+
+    monitor = DriftMonitor.load_reference(args.reference)
+    for chunk in pd.read_csv(args.input, chunksize=args.chunk_size):
+        monitor.update(chunk)
+    report = monitor.report()
+    print(f"{monitor.n_rows} rows")
+    print(report.to_string(index=False))
+    if args.output:
+        report.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# Single-pass model evaluation used by Model_Training_Notebook.py
+#
+# Each model is scored with one predict_proba call on the test set. Labels come
+# from thresholding the positive-class probability (what predict does for a
+# binary classifier), and accuracy, precision, recall, F1, ROC-AUC and the ROC
+# curve are all read off the cumulative true/false positive counts of one
+# descending sort of the scores, instead of one sklearn pass per metric.
+#
+# cross_validate_cv and learning_curve_cv replace sklearn's cross_val_score and
+# learning_curve for the best model. The stratified folds are computed once and
+# shared. The cross-validation scores come from cold, plain fits, as
+# cross_val_score's did. The learning curve is the cheap approximation: CatBoost
+# and LightGBM stop early on a split held out of each training prefix (never
+# the scored fold), and estimators with warm_start continue from the fit on the
+# previous (nested) training size instead of starting over.
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.neural_network import MLPClassifier
+
+from model_artifacts import limit_model_threads
+
+# Estimators whose warm_start reuses the previous solution as the starting
+# point of the next fit. Ensembles also take warm_start, but for them it only
+# adds trees, which is wrong once the training rows change.
+WARM_START_ESTIMATORS = (LogisticRegression, SGDClassifier, MLPClassifier)
+
+
+def binary_metrics(y_true, scores, threshold=0.5):
+    """Metrics of a binary scorer from one sort of its scores.
+
+    y_true is a boolean array (True for the positive class), scores the
+    positive-class probabilities. Rows with score > threshold are predicted
+    positive. Returns (metrics, fpr, tpr); the metric values and the curve
+    match sklearn's accuracy/precision/recall/f1/roc_auc_score and roc_curve
+    (without drop_intermediate).
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores = scores[order]
+    tps = np.cumsum(y_true[order])
+    fps = np.arange(1, len(scores) + 1) - tps
+    n_pos, n_neg = tps[-1], fps[-1]
+
+    # Confusion counts at the threshold: the predicted positives are a prefix of the sort
+    n_pred = np.searchsorted(-sorted_scores, -threshold, side="left")
+    tp = tps[n_pred - 1] if n_pred else 0
+    fp = n_pred - tp
+    tn = n_neg - fp
+    precision = tp / n_pred if n_pred else 0.0
+    recall = tp / n_pos if n_pos else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    # ROC points at the last index of every run of tied scores
+    distinct = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1]
+    tpr = np.r_[0.0, tps[distinct] / n_pos] if n_pos else np.full(len(distinct) + 1, np.nan)
+    fpr = np.r_[0.0, fps[distinct] / n_neg] if n_neg else np.full(len(distinct) + 1, np.nan)
+
+    metrics = {
+        "Accuracy": (tp + tn) / len(scores),
+        "Precision": precision,
+        "Recall": recall,
+        "F1 Score": f1,
+        "ROC-AUC": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2) if n_pos and n_neg else float("nan"),
+    }
+    return metrics, fpr, tpr
+
+
+def check_binary_metrics(y_true, scores, threshold=0.5, rtol=1e-9, atol=1e-12):
+    """Raise AssertionError unless binary_metrics agrees with sklearn on these scores."""
+    from sklearn.metrics import (accuracy_score, f1_score, precision_score, recall_score, roc_auc_score,
+                                 roc_curve)
+
+    y_true = np.asarray(y_true, dtype=bool)
+    metrics, fpr, tpr = binary_metrics(y_true, scores, threshold)
+    y_pred = np.asarray(scores) > threshold
+    expected = {
+        "Accuracy": accuracy_score(y_true, y_pred),
+        "Precision": precision_score(y_true, y_pred, zero_division=0),
+        "Recall": recall_score(y_true, y_pred, zero_division=0),
+        "F1 Score": f1_score(y_true, y_pred, zero_division=0),
+        "ROC-AUC": roc_auc_score(y_true, scores),
+    }
+    mismatched = {k: (metrics[k], v) for k, v in expected.items()
+                  if not np.isclose(metrics[k], v, rtol=rtol, atol=atol)}
+    assert not mismatched, f"binary_metrics differs from sklearn (ours, sklearn): {mismatched}"
+    sk_fpr, sk_tpr, _ = roc_curve(y_true, scores, drop_intermediate=False)
+    assert np.allclose(fpr, sk_fpr, rtol=rtol, atol=atol) and np.allclose(tpr, sk_tpr, rtol=rtol, atol=atol), \
+        "binary_metrics ROC curve differs from sklearn's roc_curve"
+
+
+def evaluate_model(name, model, X_test, y_test, pos_label="CONFIRMED", threshold=0.5, verify=False):
+    """Return (name, metrics, fpr, tpr, seconds) for one fitted model.
+
+    With verify, the metrics are also recomputed with sklearn and compared
+    (see check_binary_metrics); the check is not included in the seconds.
+    """
+    started = time.perf_counter()
+    pos_index = list(model.classes_).index(pos_label)
+    scores = model.predict_proba(X_test)[:, pos_index]
+    metrics, fpr, tpr = binary_metrics(np.asarray(y_test) == pos_label, scores, threshold)
+    elapsed = time.perf_counter() - started
+    if verify:
+        check_binary_metrics(np.asarray(y_test) == pos_label, scores, threshold)
+    return name, {"Model": name, **metrics}, fpr, tpr, elapsed
+
+
+def evaluate_models(models, X_test, y_test, pos_label="CONFIRMED", threshold=0.5, max_workers=None,
+                    verify=False):
+    """evaluate_model for every model of the dict, concurrently on a thread pool.
+
+    The fitted models are already in memory and their predict_proba calls
+    mostly run outside the GIL, so threads avoid pickling them to processes.
+    Results are returned in the dict's order.
+    """
+    if not models:
+        return []
+    max_workers = max_workers or min(len(models), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(evaluate_model, name, model, X_test, y_test, pos_label, threshold, verify)
+                   for name, model in models.items()]
+        return [future.result() for future in futures]
+
+
+def cv_folds(X, y, cv=5, random_state=None):
+    """Stratified (train_idx, val_idx) pairs, computed once and shared by every diagnostic."""
+    shuffle = random_state is not None
+    splitter = StratifiedKFold(n_splits=cv, shuffle=shuffle, random_state=random_state)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, "iloc") else np.asarray(data)[idx]
+
+
+def _fit(model, X_train, y_train, early_stopping_rounds, early_stopping_fraction=0.1, random_state=0):
+    """Fit model; boosted models early-stop on a stratified split held out of the training rows."""
+    kind = type(model).__name__
+    boosted = kind.startswith("CatBoost") or kind.startswith("LGBM")
+    if not (early_stopping_rounds and boosted):
+        return model.fit(X_train, y_train)
+
+    X_fit, X_stop, y_fit, y_stop = train_test_split(X_train, y_train, test_size=early_stopping_fraction,
+                                                    stratify=y_train, random_state=random_state)
+    if kind.startswith("CatBoost"):
+        model.fit(X_fit, y_fit, eval_set=(X_stop, y_stop), early_stopping_rounds=early_stopping_rounds,
+                  use_best_model=True, verbose=False)
+    else:
+        import lightgbm
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], eval_metric="auc",
+                  callbacks=[lightgbm.early_stopping(early_stopping_rounds, verbose=False)])
+    return model
+
+
+def _roc_auc(model, X, y, pos_label):
+    scores = model.predict_proba(X)[:, list(model.classes_).index(pos_label)]
+    return binary_metrics(np.asarray(y) == pos_label, scores)[0]["ROC-AUC"]
+
+
+def _fold_curve(model, X, y, train_idx, val_idx, sizes, pos_label, early_stopping_rounds, n_threads):
+    """Train and validation ROC-AUC at each training size for one fold."""
+    X_val, y_val = _take(X, val_idx), _take(y, val_idx)
+    warm = isinstance(model, WARM_START_ESTIMATORS)
+    if warm:
+        estimator = limit_model_threads(clone(model), n_threads).set_params(warm_start=True)
+    train_scores, val_scores = [], []
+    # The training sets are nested prefixes of the fold, as in sklearn's learning_curve
+    for n in sizes:
+        X_train, y_train = _take(X, train_idx[:n]), _take(y, train_idx[:n])
+        if not warm:
+            estimator = limit_model_threads(clone(model), n_threads)
+        _fit(estimator, X_train, y_train, early_stopping_rounds)
+        train_scores.append(_roc_auc(estimator, X_train, y_train, pos_label))
+        val_scores.append(_roc_auc(estimator, X_val, y_val, pos_label))
+    return train_scores, val_scores
+
+
+def learning_curve_cv(model, X, y, folds, train_sizes=np.linspace(0.1, 1.0, 10), pos_label="CONFIRMED",
+                      early_stopping_rounds=50, n_jobs=None):
+    """ROC-AUC learning curve of model on precomputed folds.
+
+    Returns (train_sizes_abs, train_scores, val_scores) shaped like sklearn's
+    learning_curve. Folds run in parallel, sizes sequentially within a fold so
+    warm starts can chain. Early stopping and warm starts make the points
+    differ from cold fits of model, so the 100% point is not a
+    cross-validation score; use cross_validate_cv for that.
+    """
+    n_train = min(len(train_idx) for train_idx, _ in folds)
+    sizes = np.unique(np.clip((np.asarray(train_sizes) * n_train).astype(int), 1, n_train))
+    n_workers = min(len(folds), n_jobs or os.cpu_count() or 1)
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    per_fold = Parallel(n_jobs=n_workers)(
+        delayed(_fold_curve)(model, X, y, train_idx, val_idx, sizes, pos_label, early_stopping_rounds, n_threads)
+        for train_idx, val_idx in folds)
+    train_scores = np.array([scores for scores, _ in per_fold]).T
+    val_scores = np.array([scores for _, scores in per_fold]).T
+    return sizes, train_scores, val_scores
+
+
+def _cold_fold_score(model, X, y, train_idx, val_idx, pos_label, n_threads):
+    estimator = limit_model_threads(clone(model), n_threads).fit(_take(X, train_idx), _take(y, train_idx))
+    return _roc_auc(estimator, _take(X, val_idx), _take(y, val_idx), pos_label)
+
+
+def cross_validate_cv(model, X, y, folds, pos_label="CONFIRMED", n_jobs=None):
+    """Validation ROC-AUC of a cold, plain fit of model on each precomputed fold, like cross_val_score."""
+    n_workers = min(len(folds), n_jobs or os.cpu_count() or 1)
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    return np.array(Parallel(n_jobs=n_workers)(
+        delayed(_cold_fold_score)(model, X, y, train_idx, val_idx, pos_label, n_threads)
+        for train_idx, val_idx in folds))
@@ -0,0 +1,108 @@
+# Batched exploration of a model's decision surface
+#
+# sweep() samples many feature vectors inside per-feature [min, max] ranges
+# (uniformly or by Latin hypercube) and scores them all with predict_proba in a
+# few large chunks, instead of one rerun and one prediction per random draw.
+# marginal_curves() summarises a sweep as the mean probability per feature bin.
+# sensitivity_1d() and sensitivity_2d() vary one or two features of a single
+# input over a grid and score the whole grid in one predict_proba call.
+import numpy as np
+
+SWEEP_CHUNK_SIZE = 100_000
+
+
+def sample_uniform(lows, highs, n, rng):
+    """n rows drawn independently and uniformly inside [lows, highs]."""
+    return rng.uniform(lows, highs, size=(n, len(lows)))
+
+
+def sample_latin_hypercube(lows, highs, n, rng):
+    """n rows of a Latin hypercube inside [lows, highs].
+
+    Each feature's range is split into n equal strata and every stratum is
+    hit exactly once, so the marginals are covered evenly even for small n.
+    """
+    d = len(lows)
+    strata = rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+    unit = (strata + rng.random((n, d))) / n
+    return lows + unit * (highs - lows)
+
+
+SAMPLERS = {"uniform": sample_uniform, "latin hypercube": sample_latin_hypercube}
+
+
+def sweep(model, feature_names, ranges, n, method="uniform", pos_label="CONFIRMED", seed=None,
+          chunk_size=SWEEP_CHUNK_SIZE):
+    """Score n random inputs drawn from ranges ({feature: (min, max)}).
+
+    Features of feature_names without a range are held at 0, the scaled
+    mean, as in the app's form. Returns (samples, scores): the sampled values
+    of the ranged features (n x len(ranges), in ranges order) and the
+    pos_label probability of every sample.
+    """
+    names = list(ranges)
+    lows = np.array([ranges[f][0] for f in names], dtype=np.float64)
+    highs = np.array([ranges[f][1] for f in names], dtype=np.float64)
+    samples = SAMPLERS[method](lows, highs, n, np.random.default_rng(seed))
+
+    index = {name: idx for idx, name in enumerate(feature_names)}
+    columns = [index[f] for f in names if f in index]
+    sampled = [i for i, f in enumerate(names) if f in index]
+    pos_index = list(model.classes_).index(pos_label)
+    scores = np.empty(n, dtype=np.float64)
+    X = np.zeros((min(chunk_size, n), len(feature_names)), dtype=np.float64)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = X[:stop - start]
+        chunk[:, columns] = samples[start:stop, sampled]
+        scores[start:stop] = model.predict_proba(chunk)[:, pos_index]
+    return samples, scores
+
+
+def marginal_curves(samples, scores, ranges, bins=20):
+    """Mean score per equal-width bin of every sampled feature.
+
+    Returns {feature: (bin_centers, mean_scores)}; empty bins are NaN.
+    """
+    curves = {}
+    for idx, (feature, (low, high)) in enumerate(ranges.items()):
+        edges = np.linspace(low, high, bins + 1)
+        which = np.clip(np.searchsorted(edges, samples[:, idx], side="right") - 1, 0, bins - 1)
+        counts = np.bincount(which, minlength=bins)
+        sums = np.bincount(which, weights=scores, minlength=bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            curves[feature] = ((edges[:-1] + edges[1:]) / 2, sums / counts)
+    return curves
+
+
+def _base_matrix(feature_names, x, n_rows):
+    """n_rows copies of input x (a {feature: value} dict) in feature_names order."""
+    row = np.array([x.get(f, 0.0) for f in feature_names], dtype=np.float64)
+    return np.tile(row, (n_rows, 1))
+
+
+def sensitivity_1d(model, feature_names, x, feature, value_range, n_points=100, pos_label="CONFIRMED"):
+    """pos_label probability of x as feature moves across value_range.
+
+    Returns (grid, scores), both of length n_points.
+    """
+    grid = np.linspace(value_range[0], value_range[1], n_points)
+    X = _base_matrix(feature_names, x, n_points)
+    X[:, list(feature_names).index(feature)] = grid
+    return grid, model.predict_proba(X)[:, list(model.classes_).index(pos_label)]
+
+
+def sensitivity_2d(model, feature_names, x, feature_x, range_x, feature_y, range_y, n_points=50,
+                   pos_label="CONFIRMED"):
+    """pos_label probability of x on an n_points x n_points grid of two features.
+
+    Returns (grid_x, grid_y, scores) with scores[i, j] at (grid_x[j], grid_y[i]).
+    """
+    grid_x = np.linspace(range_x[0], range_x[1], n_points)
+    grid_y = np.linspace(range_y[0], range_y[1], n_points)
+    X = _base_matrix(feature_names, x, n_points * n_points)
+    names = list(feature_names)
+    X[:, names.index(feature_x)] = np.tile(grid_x, n_points)
+    X[:, names.index(feature_y)] = np.repeat(grid_y, n_points)
+    scores = model.predict_proba(X)[:, list(model.classes_).index(pos_label)]
+    return grid_x, grid_y, scores.reshape(n_points, n_points)
@@ -0,0 +1,178 @@
+# Parallel hyperparameter search over the model zoo with successive halving
+#
+# Usage:
+#   python hyperparameter_search.py                        # every model, all local cores
+#   python hyperparameter_search.py --models lightgbm catboost --brackets 3
+#   python hyperparameter_search.py --backend dask --address tcp://scheduler:8786
+#
+# Each model is searched with HalvingRandomSearchCV on the output of
+# preprocess_inputs: many random configurations start on a small share of the
+# training rows, and only the best 1/factor of them move on to factor times
+# more rows, so bad configurations are dropped after cheap fits. --brackets N
+# runs N successive-halving brackets with increasingly large starting budgets
+# (Hyperband) and keeps the best. Trials run through joblib, on local
+# processes by default or on a Dask or Ray cluster. The best configuration is
+# written next to the model pickle as <stem>.best_params.json, which
+# Model_Training_Notebook.py applies on the next training run.
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.discriminant_analysis import QuadraticDiscriminantAnalysis
+from sklearn.neural_network import MLPClassifier
+from lightgbm import LGBMClassifier
+from catboost import CatBoostClassifier
+
+from knn_index import KNNIndexClassifier
+from model_artifacts import limit_model_threads
+from training import best_params_path
+
+# Estimator and search space per model, keyed by the model's pickle stem
+SEARCH_SPACES = {
+    "logistic_regression": (LogisticRegression(max_iter=1000), {
+        "C": loguniform(1e-3, 1e3),
+    }),
+    "decision_tree": (DecisionTreeClassifier(), {
+        "max_depth": randint(2, 30),
+        "min_samples_leaf": randint(1, 50),
+        "criterion": ["gini", "entropy"],
+    }),
+    "random_forest": (RandomForestClassifier(), {
+        "n_estimators": randint(100, 800),
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": randint(1, 20),
+        "max_features": ["sqrt", "log2", 0.5],
+    }),
+    "gradient_boosting": (GradientBoostingClassifier(), {
+        "n_estimators": randint(100, 600),
+        "learning_rate": loguniform(1e-2, 3e-1),
+        "max_depth": randint(2, 8),
+        "subsample": uniform(0.5, 0.5),
+    }),
+    "lightgbm": (LGBMClassifier(verbose=-1), {
+        "n_estimators": randint(100, 1000),
+        "learning_rate": loguniform(1e-2, 3e-1),
+        "num_leaves": randint(8, 256),
+        "min_child_samples": randint(5, 100),
+        "subsample": uniform(0.5, 0.5),
+        "subsample_freq": [1],
+        "colsample_bytree": uniform(0.4, 0.6),
+        "reg_lambda": loguniform(1e-3, 10),
+    }),
+    "catboost": (CatBoostClassifier(verbose=0), {
+        "iterations": randint(200, 1500),
+        "learning_rate": loguniform(1e-2, 3e-1),
+        "depth": randint(4, 10),
+        "l2_leaf_reg": loguniform(1, 30),
+    }),
+    "sgd_classifier": (SGDClassifier(loss="log_loss"), {
+        "alpha": loguniform(1e-6, 1e-1),
+        "penalty": ["l2", "l1", "elasticnet"],
+    }),
+    "k-nearest_neighbors": (KNNIndexClassifier(), {
+        "n_neighbors": randint(3, 51),
+        "leaf_size": randint(10, 100),
+    }),
+    "qda": (QuadraticDiscriminantAnalysis(), {
+        "reg_param": uniform(0.0, 1.0),
+    }),
+    "neural_net_(mlp)": (MLPClassifier(max_iter=500), {
+        "hidden_layer_sizes": [(64,), (128,), (64, 32), (128, 64)],
+        "alpha": loguniform(1e-6, 1e-1),
+        "learning_rate_init": loguniform(1e-4, 1e-2),
+    }),
+}
+
+
+# Runtime settings, left to the training script's thread limits
+THREAD_PARAMS = {"n_jobs", "thread_count"}
+
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def estimator_params(stem, params):
+    """Every constructor parameter of the searched estimator with params applied.
+
+    Saved alongside the sampled params so training reproduces the estimator
+    that was scored, including settings fixed in SEARCH_SPACES (e.g.
+    LogisticRegression's max_iter) that the training script's defaults lack.
+    """
+    tuned = clone(SEARCH_SPACES[stem][0]).set_params(**params)
+    return {k: _to_json(v) for k, v in tuned.get_params(deep=False).items() if k not in THREAD_PARAMS}
+
+
+def search_model(stem, X, y, n_candidates=64, factor=3, brackets=1, cv=5, n_jobs=-1, random_state=1):
+    """Successive-halving random search for one model; returns (best_params, best_score)."""
+    estimator, space = SEARCH_SPACES[stem]
+    # Trials already run in parallel, so each fit gets one thread
+    estimator = limit_model_threads(clone(estimator), 1)
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    smallest = 2 * cv * len(np.unique(y))
+
+    best_params, best_score = None, -np.inf
+    for bracket in range(brackets):
+        # Later brackets try fewer configurations from a larger starting budget
+        min_resources = min(smallest * factor ** bracket, len(X) // factor)
+        search = HalvingRandomSearchCV(
+            estimator, space, n_candidates=max(factor, n_candidates // factor ** bracket),
+            factor=factor, resource="n_samples", min_resources=min_resources, cv=folds,
+            scoring="roc_auc", refit=False, n_jobs=n_jobs, random_state=random_state + bracket,
+        )
+        search.fit(X, y)
+        if search.best_score_ > best_score:
+            best_params, best_score = search.best_params_, search.best_score_
+    return {k: _to_json(v) for k, v in best_params.items()}, float(best_score)
+
+
+def main(argv=None):
+    from data_cache import load_training_data
+
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search.")
+    parser.add_argument("--models", nargs="+", default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument("--catalog", default="cumulative.csv")
+    parser.add_argument("--n-candidates", type=int, default=64, help="Configurations in the first bracket")
+    parser.add_argument("--factor", type=int, default=3, help="Halving factor")
+    parser.add_argument("--brackets", type=int, default=1, help="Hyperband brackets (1 = plain successive halving)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--backend", choices=["loky", "dask", "ray"], default="loky")
+    parser.add_argument("--address", default=None, help="Dask scheduler / Ray cluster address (default: local)")
+    args = parser.parse_args(argv)
+
+    X_train, _, y_train, _, _ = load_training_data(args.catalog)
+
+    if args.backend == "dask":
+        from dask.distributed import Client
+        client = Client(args.address) if args.address else Client()
+        print(f"Dask dashboard: {client.dashboard_link}")
+    elif args.backend == "ray":
+        import ray
+        from ray.util.joblib import register_ray
+        ray.init(address=args.address)
+        register_ray()
+
+    with joblib.parallel_backend(args.backend, n_jobs=args.n_jobs):
+        for stem in args.models:
+            started = time.perf_counter()
+            params, score = search_model(stem, X_train, y_train, n_candidates=args.n_candidates,
+                                         factor=args.factor, brackets=args.brackets, n_jobs=args.n_jobs)
+            elapsed = time.perf_counter() - started
+            with open(best_params_path(stem), "w") as f:
+                json.dump({"model": stem, "cv_roc_auc": score, "params": params,
+                           "estimator_params": estimator_params(stem, params),
+                           "search_seconds": elapsed}, f, indent=2)
+            print(f"{stem}: CV ROC-AUC {score:.4f} in {elapsed:.0f}s -> {best_params_path(stem)} {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# Asynchronous HTTP inference service
+#
+# Usage:
+#   python inference_server.py --model catboost.pkl --port 8080
+#
+#   curl -X POST localhost:8080/predict -d '{"features": {"koi_period": 0.1, ...}}'
+#   curl -X POST localhost:8080/predict_batch -d '{"rows": [[...34 values...], ...]}'
+#   curl -X POST localhost:8080/predict_batch --data-binary @rows.arrows \
+#        -H 'Content-Type: application/vnd.apache.arrow.stream'
+#   curl localhost:8080/drift    # PSI/KS of the scored inputs vs the training data
+#
+# Inputs are the same scaled features the Streamlit app takes, in
+# FEATURE_NAMES order for arrays. Model calls run on a thread pool, so the
+# event loop only parses requests and never blocks on inference. Concurrent
+# /predict requests are micro-batched (see microbatch.py) into one
+# predict_proba call of up to --max-batch-size rows, waiting at most
+# --max-wait-ms for a batch to fill; --max-wait-ms 0 scores each row alone.
+# When drift_reference.json exists, every scored row is counted into a
+# DriftMonitor (see drift.py) on the worker threads.
+import argparse
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from drift import REFERENCE_PATH, DriftMonitor
+from microbatch import MicroBatcher
+from model_artifacts import artifact_stem, find_model_file, load_model_file
+from predictor import Predictor, ignore_feature_names_warning
+from preprocessing import FEATURE_NAMES
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+class InferenceService:
+    """Runs model calls for the HTTP handlers on a bounded worker pool."""
+
+    def __init__(self, model, feature_names=None, max_workers=None, max_in_flight=1024,
+                 max_batch_size=64, max_wait_ms=2.0, executor=None, drift_monitor=None):
+        self.model = model
+        self.feature_names = list(feature_names or FEATURE_NAMES)
+        self.classes = [str(c) for c in model.classes_]
+        self._index = {name: idx for idx, name in enumerate(self.feature_names)}
+        self.drift_monitor = drift_monitor
+        max_workers = max_workers or os.cpu_count()
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.batcher = None
+        if max_wait_ms > 0 and max_batch_size > 1:
+            self.batcher = MicroBatcher(self._predict_many, max_batch_size,
+                                        max_wait_ms, executor=self.executor, max_concurrent=max_workers)
+        # Caps queued model calls so a burst cannot grow memory without bound
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        # Predictor reuses one input buffer, so each worker thread gets its own
+        self._local = threading.local()
+
+    def _predictor(self):
+        predictor = getattr(self._local, "predictor", None)
+        if predictor is None:
+            predictor = self._local.predictor = Predictor(self.model, self.feature_names)
+        return predictor
+
+    def _track_drift(self, X):
+        if self.drift_monitor is None:
+            return
+        if self.drift_monitor.feature_names != self.feature_names:
+            X = pd.DataFrame(np.atleast_2d(X), columns=self.feature_names)
+        self.drift_monitor.update(X)
+
+    def _predict_many(self, X):
+        self._track_drift(X)
+        return self._predictor().predict_many(X)
+
+    def _rows_to_matrix(self, rows):
+        if rows and isinstance(rows[0], dict):
+            return pd.DataFrame(rows).reindex(columns=self.feature_names, fill_value=0).to_numpy(np.float64)
+        X = np.asarray(rows, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(f"expected rows of {len(self.feature_names)} features, got shape {X.shape}")
+        return X
+
+    def _arrow_to_matrix(self, body):
+        import pyarrow as pa
+        table = pa.ipc.open_stream(body).read_all()
+        missing = [f for f in self.feature_names if f not in table.column_names]
+        if missing:
+            raise ValueError(f"missing feature columns: {', '.join(missing)}")
+        return table.select(self.feature_names).to_pandas().to_numpy(np.float64)
+
+    def _feature_row(self, features):
+        """Dict or list of features as a 1-D array; missing dict features are 0."""
+        if isinstance(features, dict):
+            row = np.zeros(len(self.feature_names))
+            for name, value in features.items():
+                idx = self._index.get(name)
+                if idx is not None:
+                    row[idx] = value
+            return row
+        row = np.asarray(features, dtype=np.float64)
+        if row.shape != (len(self.feature_names),):
+            raise ValueError(f"expected {len(self.feature_names)} features, got {row.shape}")
+        return row
+
+    def _format_one(self, label, proba):
+        return {"prediction": str(label), "probabilities": dict(zip(self.classes, proba.tolist()))}
+
+    def predict_one(self, row):
+        self._track_drift(row)
+        return self._format_one(*self._predictor().predict(row))
+
+    def predict_batch(self, X):
+        labels, proba = self._predict_many(X)
+        return {"classes": self.classes, "predictions": [str(l) for l in labels],
+                "probabilities": proba.tolist()}
+
+    async def run(self, func, *args):
+        async with self._in_flight:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def handle_predict(self, request):
+        try:
+            payload = await request.json()
+            features = payload.get("features", payload) if isinstance(payload, dict) else payload
+            row = self._feature_row(features)
+            if self.batcher is not None:
+                # Queued rows count against the same in-flight cap as direct model calls
+                async with self._in_flight:
+                    result = await self.batcher.predict(row)
+                return web.json_response(self._format_one(*result))
+            return web.json_response(await self.run(self.predict_one, row))
+        except (ValueError, TypeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+    async def handle_predict_batch(self, request):
+        try:
+            if request.content_type == ARROW_STREAM:
+                X = await self.run(self._arrow_to_matrix, await request.read())
+            else:
+                payload = await request.json()
+                X = await self.run(self._rows_to_matrix, payload["rows"] if isinstance(payload, dict) else payload)
+            return web.json_response(await self.run(self.predict_batch, X))
+        except (ValueError, TypeError, KeyError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+    async def handle_health(self, request):
+        return web.json_response({"status": "ok", "features": len(self.feature_names), "classes": self.classes})
+
+
+def create_app(model_path=None, max_workers=None, max_in_flight=1024, max_batch_size=64, max_wait_ms=2.0,
+               registry=None, drift_monitor=None):
+    """Build the aiohttp application; usable directly with aiohttp's test client.
+
+    With a ModelRegistry every model it holds is served and picked with
+    ``?model=<name>`` (e.g. ``?model=lightgbm``); model_path, or the app's
+    default candidate, is served when no name is given. Inputs of every model
+    are counted into drift_monitor, by default a DriftMonitor over
+    drift_reference.json when that file exists.
+    """
+    ignore_feature_names_warning()
+    if drift_monitor is None and os.path.exists(REFERENCE_PATH):
+        drift_monitor = DriftMonitor.load_reference(REFERENCE_PATH)
+    model_path = model_path or find_model_file() or (registry.fnames[0] if registry else None)
+    if model_path is None:
+        raise FileNotFoundError("no model file found")
+    executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+    loaded = {artifact_stem(f): registry.get(f) for f in registry.fnames} if registry else {}
+    default = artifact_stem(model_path)
+    if default not in loaded:
+        loaded[default] = load_model_file(model_path)
+    services = {name: InferenceService(model, feature_names, max_workers, max_in_flight,
+                                       max_batch_size, max_wait_ms, executor=executor, drift_monitor=drift_monitor)
+                for name, (model, feature_names) in loaded.items()}
+
+    def route(handler_name):
+        async def handler(request):
+            name = request.query.get("model", default)
+            service = services.get(name)
+            if service is None:
+                return web.json_response({"error": f"unknown model {name!r}", "models": sorted(services)},
+                                         status=404)
+            return await getattr(service, handler_name)(request)
+        return handler
+
+    async def handle_drift(request):
+        if drift_monitor is None:
+            return web.json_response({"error": f"no {REFERENCE_PATH} found"}, status=404)
+        report = drift_monitor.report()
+        return web.json_response({"rows": drift_monitor.n_rows,
+                                  "features": report.astype(object).where(report.notna(), None).to_dict("records")})
+
+    async def stop_services(app):
+        for service in services.values():
+            if service.batcher is not None:
+                await service.batcher.stop()
+        executor.shutdown(wait=False)
+
+    app = web.Application(client_max_size=256 * 2**20)
+    app["services"] = services
+    app["model_path"] = model_path
+    app.on_cleanup.append(stop_services)
+    app.router.add_post("/predict", route("handle_predict"))
+    app.router.add_post("/predict_batch", route("handle_predict_batch"))
+    app.router.add_get("/health", route("handle_health"))
+    app.router.add_get("/drift", handle_drift)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve exoplanet predictions over HTTP.")
+    parser.add_argument("--model", default=None, help="Model pickle (default: first of the app's candidates)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Inference threads (default: all cores)")
+    parser.add_argument("--max-in-flight", type=int, default=1024, help="Queued model calls before requests wait")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Rows coalesced into one /predict model call")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Longest a /predict row waits for its batch")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.model, max_workers=args.workers, max_in_flight=args.max_in_flight,
+                     max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# k-Nearest Neighbors classifier backed by an explicit, persisted spatial index
+#
+# KNeighborsClassifier() picks its search algorithm at fit time and hides it;
+# KNNIndexClassifier always builds the requested KD-tree or ball tree, keeps it
+# in the pickle (so loading never rebuilds it) and answers predictions with
+# batched neighbor queries.
+#
+# Usage (compare the persisted index against brute force):
+#   python knn_index.py --model k-nearest_neighbors.pkl --queries 100000
+import argparse
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.neighbors import BallTree, KDTree, NearestNeighbors
+
+TREES = {"kd_tree": KDTree, "ball_tree": BallTree}
+
+
+class KNNIndexClassifier(ClassifierMixin, BaseEstimator):
+    """Uniform-weight kNN vote over a persisted KD-tree or ball tree.
+
+    Predictions match KNeighborsClassifier with the same n_neighbors. Queries
+    are issued in batch_size blocks, spread over n_jobs threads (the tree
+    query releases the GIL).
+    """
+
+    def __init__(self, n_neighbors=5, algorithm="kd_tree", leaf_size=40, batch_size=10_000, n_jobs=None):
+        self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+        self.classes_, self.y_codes_ = np.unique(np.asarray(y), return_inverse=True)
+        self.tree_ = TREES[self.algorithm](X, leaf_size=self.leaf_size)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def kneighbors(self, X):
+        """Return (distances, indices) of the n_neighbors nearest training rows."""
+        X = np.asarray(X, dtype=np.float64)
+        batches = [X[start:start + self.batch_size] for start in range(0, len(X), self.batch_size)]
+        query = delayed(self.tree_.query)
+        if self.n_jobs not in (None, 1) and len(batches) > 1:
+            results = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+                query(batch, k=self.n_neighbors) for batch in batches)
+        else:
+            results = [self.tree_.query(batch, k=self.n_neighbors) for batch in batches]
+        return np.vstack([r[0] for r in results]), np.vstack([r[1] for r in results])
+
+    def predict_proba(self, X):
+        _, indices = self.kneighbors(X)
+        votes = self.y_codes_[indices]
+        counts = np.stack([(votes == code).sum(axis=1) for code in range(len(self.classes_))], axis=1)
+        return counts / self.n_neighbors
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def fit_data(model):
+    """Training matrix of a fitted KNNIndexClassifier or KNeighborsClassifier."""
+    if isinstance(model, KNNIndexClassifier):
+        return np.asarray(model.tree_.get_arrays()[0])
+    return np.asarray(model._fit_X)
+
+
+def compare_with_brute_force(model, X_train, X_query):
+    """Time the index against an exhaustive search and check neighbor recall."""
+    k = model.n_neighbors
+    brute = NearestNeighbors(n_neighbors=k, algorithm="brute").fit(X_train)
+
+    started = time.perf_counter()
+    _, brute_ind = brute.kneighbors(X_query)
+    brute_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, index_ind = model.kneighbors(X_query)
+    index_s = time.perf_counter() - started
+
+    hits = (index_ind[:, :, None] == brute_ind[:, None, :]).any(axis=2).sum(axis=1)
+    return {"queries": len(X_query), "index_s": index_s, "brute_s": brute_s,
+            "speedup": brute_s / index_s, "recall": float(hits.mean() / k)}
+
+
+def main(argv=None):
+    from model_artifacts import load_model_file
+
+    parser = argparse.ArgumentParser(description="Benchmark the kNN spatial index against brute force.")
+    parser.add_argument("--model", default="k-nearest_neighbors.pkl")
+    parser.add_argument("--queries", type=int, default=100_000, help="Synthetic query rows")
+    parser.add_argument("--algorithms", nargs="+", default=["kd_tree", "ball_tree"])
+    parser.add_argument("--n-jobs", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    model, _ = load_model_file(args.model)
+    X_train = fit_data(model)
+    y = model.classes_[model.y_codes_] if isinstance(model, KNNIndexClassifier) else model.classes_[model._y]
+
+    # Queries are training rows jittered by 10% of each feature's spread
+    rng = np.random.default_rng(0)
+    X_query = X_train[rng.integers(len(X_train), size=args.queries)]
+    X_query = X_query + rng.normal(0, 0.1, X_query.shape) * X_train.std(axis=0)
+
+    for algorithm in args.algorithms:
+        started = time.perf_counter()
+        index = KNNIndexClassifier(n_neighbors=getattr(model, "n_neighbors", 5), algorithm=algorithm,
+                                   n_jobs=args.n_jobs).fit(X_train, y)
+        build_s = time.perf_counter() - started
+        stats = compare_with_brute_force(index, X_train, X_query)
+        print(f"{algorithm:>9}: build {build_s:.3f}s | query {stats['index_s']:.3f}s | "
+              f"brute {stats['brute_s']:.3f}s | {stats['speedup']:.1f}x | recall {stats['recall']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
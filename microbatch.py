@@ -0,0 +1,94 @@
+# Dynamic micro-batching of single-row predictions
+#
+# CatBoost and LightGBM pay a fixed overhead per predict_proba call, so scoring
+# concurrent single-row requests one by one wastes most of the time. The
+# MicroBatcher queues rows from any number of coroutines, flushes them as one
+# matrix when max_batch_size rows are waiting or the oldest has waited
+# max_wait_ms, and routes each result back to its caller.
+import asyncio
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into batched predict_many calls.
+
+    predict_many takes a 2-D array and returns (labels, probabilities); it runs
+    on executor (the loop's default when None), with at most max_concurrent
+    batches in flight.
+    """
+
+    def __init__(self, predict_many, max_batch_size=64, max_wait_ms=2.0, executor=None, max_concurrent=4):
+        self.predict_many = predict_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1e3
+        self.executor = executor
+        self.max_concurrent = max_concurrent
+        self._queue = None
+        self._collector = None
+        self._batches = set()
+
+    def start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, *self._batches, return_exceptions=True)
+            self._collector = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def predict(self, row):
+        """Return (label, probabilities) for one feature row."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            try:
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+
+            task = loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            X = np.stack([row for row, _ in batch])
+            labels, proba = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_many, X)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((labels[i], proba[i]))
+        finally:
+            self._slots.release()
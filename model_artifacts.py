@@ -0,0 +1,156 @@
+# Loading helpers for the trained model artifacts shipped next to the scripts
+#
+# Besides the joblib pickles, the training script exports every model to
+# artifacts/ in a native or array-backed format:
+#   - CatBoost  -> <stem>.cbm       (CatBoost's own binary format)
+#   - LightGBM  -> <stem>.lgb.txt   (text booster dump, plus <stem>.classes.json)
+#   - others    -> <stem>.joblib    (uncompressed, page-aligned numpy arrays)
+# The .joblib files are loaded with mmap_mode='r', so the kNN training matrix
+# and the MLP weights are memory-mapped and shared by every process that loads
+# them instead of being copied into each one.
+import glob
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+
+# Files tried in order when no explicit model path is given
+MODEL_CANDIDATES = ["best_model.pkl", "catboost.pkl", "model.pkl", "final_model.pkl"]
+
+# Pickles in the repo root that are not classifiers
+NON_MODEL_FILES = {"scaler.pkl", "preprocessor.pkl"}
+
+ARTIFACT_DIR = "artifacts"
+
+
+class BoosterClassifier:
+    """predict_proba facade over a LightGBM Booster loaded from its text dump."""
+
+    def __init__(self, booster, classes, n_jobs=None):
+        self.booster = booster
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.n_jobs = n_jobs
+
+    def get_params(self, deep=True):
+        return {"n_jobs": self.n_jobs}
+
+    def set_params(self, **params):
+        self.n_jobs = params.get("n_jobs", self.n_jobs)
+        return self
+
+    def predict_proba(self, X):
+        kwargs = {"num_threads": self.n_jobs} if self.n_jobs else {}
+        proba = self.booster.predict(np.asarray(X, dtype=np.float64), **kwargs)
+        if proba.ndim == 1:
+            return np.column_stack([1.0 - proba, proba])
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def artifact_stem(fname):
+    return os.path.splitext(os.path.basename(fname))[0]
+
+
+def export_native_artifact(model, stem, directory=ARTIFACT_DIR):
+    """Write model to directory in its native or array-backed format and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, stem)
+    kind = type(model).__name__
+    if kind.startswith("CatBoost"):
+        path = base + ".cbm"
+        model.save_model(path, format="cbm")
+    elif kind.startswith("LGBM"):
+        path = base + ".lgb.txt"
+        model.booster_.save_model(path)
+        with open(base + ".classes.json", "w") as f:
+            json.dump(np.asarray(model.classes_).tolist(), f)
+    else:
+        path = base + ".joblib"
+        joblib.dump(model, path)
+    return path
+
+
+def native_artifact_path(fname, directory=ARTIFACT_DIR):
+    """Return the native artifact exported alongside fname, or None if absent or older."""
+    base = os.path.join(directory, artifact_stem(fname))
+    for suffix in (".cbm", ".lgb.txt", ".joblib"):
+        path = base + suffix
+        if os.path.exists(path) and (not os.path.exists(fname)
+                                     or os.path.getmtime(path) >= os.path.getmtime(fname)):
+            return path
+    return None
+
+
+def load_native_artifact(path):
+    if path.endswith(".cbm"):
+        from catboost import CatBoostClassifier
+        return CatBoostClassifier().load_model(path, format="cbm")
+    if path.endswith(".lgb.txt"):
+        import lightgbm
+        with open(path[:-len(".lgb.txt")] + ".classes.json") as f:
+            classes = json.load(f)
+        return BoosterClassifier(lightgbm.Booster(model_file=path), classes)
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_model_file(fname, prefer_native=True):
+    """Load a model, returning (model, feature_names or None).
+
+    When a native artifact at least as new as fname was exported to
+    artifacts/, it is loaded instead of unpickling fname.
+    """
+    native = native_artifact_path(fname) if prefer_native else None
+    if native is not None:
+        return load_native_artifact(native), None
+    loaded = joblib.load(fname)
+    if isinstance(loaded, tuple) and len(loaded) == 2:
+        return loaded[0], loaded[1]
+    return loaded, None
+
+
+def list_model_files(directory="."):
+    """Every model pickle in directory, sorted by name."""
+    return sorted(p for p in glob.glob(os.path.join(directory, "*.pkl"))
+                  if os.path.basename(p) not in NON_MODEL_FILES)
+
+
+class ModelRegistry:
+    """Loads model files on first use and keeps them, safe to share between threads."""
+
+    def __init__(self, fnames=None):
+        self.fnames = list(fnames) if fnames is not None else list_model_files()
+        self._models = {}
+        self._locks = {fname: threading.Lock() for fname in self.fnames}
+
+    def get(self, fname):
+        """Return (model, feature_names or None), loading fname once."""
+        if fname not in self._models:
+            with self._locks[fname]:
+                if fname not in self._models:
+                    self._models[fname] = load_model_file(fname)
+        return self._models[fname]
+
+    def load_all(self):
+        for fname in self.fnames:
+            self.get(fname)
+        return self
+
+
+def find_model_file(candidates=MODEL_CANDIDATES):
+    for fname in candidates:
+        if os.path.exists(fname):
+            return fname
+    return None
+
+
+def limit_model_threads(model, n_threads):
+    """Cap the internal thread pool of an estimator so process pools don't oversubscribe cores."""
+    if type(model).__name__.startswith("CatBoost"):
+        model.set_params(thread_count=n_threads)
+    elif "n_jobs" in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    return model
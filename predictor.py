@@ -0,0 +1,89 @@
+# Low-latency inference wrapper around a fitted classifier
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from preprocessing import FEATURE_NAMES
+
+# Models trained on DataFrames warn when scored with plain arrays, though
+# Predictor guarantees the column order
+FEATURE_NAMES_WARNING = "X does not have valid feature names"
+
+
+def ignore_feature_names_warning():
+    """Silence FEATURE_NAMES_WARNING process-wide.
+
+    Called once by the entry points that score through Predictor (the app, the
+    HTTP servers, the benchmark); scoping the filter per call with
+    warnings.catch_warnings is not thread-safe and slows every prediction.
+    """
+    warnings.filterwarnings("ignore", message=FEATURE_NAMES_WARNING)
+
+
+class Predictor:
+    """Score rows in ``feature_names`` order with a single predict_proba call.
+
+    Single rows go through a preallocated (1, n_features) buffer, so a
+    Predictor must not be shared between threads; build one per thread or
+    per request, which is cheap.
+    """
+
+    def __init__(self, model, feature_names=FEATURE_NAMES):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.classes = np.asarray(model.classes_, dtype=object)
+        self._index = {name: idx for idx, name in enumerate(self.feature_names)}
+        self._row = np.zeros((1, len(self.feature_names)), dtype=np.float64)
+
+    def predict(self, x):
+        """Return (label, probabilities) for one row given as a dict or a 1-D array.
+
+        Features missing from a dict are scored as 0, like the app's reindex did.
+        """
+        row = self._row
+        if isinstance(x, dict):
+            row.fill(0.0)
+            for name, value in x.items():
+                idx = self._index.get(name)
+                if idx is not None:
+                    row[0, idx] = value
+        else:
+            row[0] = x
+        proba = self.model.predict_proba(row)[0]
+        return self.classes[proba.argmax()], proba
+
+    def predict_many(self, X):
+        """Return (labels, probabilities) for a 2-D array of rows."""
+        proba = self.model.predict_proba(np.asarray(X, dtype=np.float64))
+        return self.classes[proba.argmax(axis=1)], proba
+
+
+def predict_all_models(registry, x, max_workers=None):
+    """Score one row on every model of a ModelRegistry concurrently on a thread pool.
+
+    Returns one dict per model with its label, class probabilities, load time
+    (zero once cached) and predict latency, in registry order. Wall-clock time
+    is close to the slowest model rather than the sum, since the model
+    libraries release the GIL while predicting.
+    """
+    def score(fname):
+        row = {"model": os.path.splitext(os.path.basename(fname))[0]}
+        try:
+            started = time.perf_counter()
+            model, feature_names = registry.get(fname)
+            row["load_ms"] = (time.perf_counter() - started) * 1e3
+            predictor = Predictor(model, feature_names or FEATURE_NAMES)
+            started = time.perf_counter()
+            label, proba = predictor.predict(x)
+            row["latency_ms"] = (time.perf_counter() - started) * 1e3
+            row["prediction"] = label
+            row.update({f"prob_{cls}": p for cls, p in zip(predictor.classes, proba)})
+        except Exception as e:
+            row["error"] = str(e)
+        return row
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(registry.fnames) or 1) as pool:
+        return list(pool.map(score, registry.fnames))
@@ -0,0 +1,156 @@
+# Pre-fork multi-process inference server
+#
+# Usage:
+#   python prefork_server.py --workers 16 --port 8080
+#
+# The parent process loads every model once, freezes the garbage collector and
+# then forks the workers, which all accept on one inherited listening socket
+# and serve the aiohttp app from inference_server.py. The workers share the
+# parent's read-only model pages copy-on-write instead of each unpickling its
+# own copy. The parent reports every worker's RSS together with its
+# proportional (PSS) and private (USS) memory, so shared and duplicated memory
+# can be told apart. The input drift counts (see drift.py) live in shared
+# memory, one slot per worker, so GET /drift on any worker reports the rows of
+# all of them. POSIX only.
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from aiohttp import web
+
+from drift import REFERENCE_PATH, DriftMonitor
+from inference_server import create_app
+from model_artifacts import ModelRegistry
+
+MEMORY_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty")
+
+
+def process_memory_mb(pid):
+    """RSS, PSS, private and shared memory of pid in MB, from /proc/<pid>/smaps_rollup."""
+    values = dict.fromkeys(MEMORY_FIELDS, 0.0)
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in values:
+                    values[key] = int(rest.split()[0]) / 1024
+    except OSError:
+        return None
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"],
+            "shared": values["Shared_Clean"] + values["Shared_Dirty"]}
+
+
+def memory_report(parent_pid, worker_pids):
+    rows = [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in enumerate(worker_pids)]
+    lines = [f"{'process':>10} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'private MB':>11} {'shared MB':>10}"]
+    totals = dict.fromkeys(("rss", "pss", "private"), 0.0)
+    for label, pid in rows:
+        mem = process_memory_mb(pid)
+        if mem is None:
+            lines.append(f"{label:>10} {pid:>8}   (memory not available)")
+            continue
+        for key in totals:
+            totals[key] += mem[key]
+        lines.append(f"{label:>10} {pid:>8} {mem['rss']:9.1f} {mem['pss']:9.1f} "
+                     f"{mem['private']:11.1f} {mem['shared']:10.1f}")
+    # PSS splits every shared page between its users, so its sum is the real footprint
+    lines.append(f"total: {totals['pss']:.1f} MB actual (sum of PSS), {totals['rss']:.1f} MB if nothing "
+                 f"were shared (sum of RSS), {totals['private']:.1f} MB private")
+    return "\n".join(lines)
+
+
+def _serve_worker(sock, registry, args, threads, drift_monitor):
+    app = create_app(args.model, max_workers=threads, max_in_flight=args.max_in_flight,
+                     max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms, registry=registry,
+                     drift_monitor=drift_monitor)
+    web.run_app(app, sock=sock, print=None)
+
+
+def _spawn(sock, registry, args, threads, slot, drift_monitor=None):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            if drift_monitor is not None:
+                drift_monitor.use_slot(slot)
+            _serve_worker(sock, registry, args, threads, drift_monitor)
+        except BaseException:
+            code = 1
+        os._exit(code)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve every model from N forked worker processes.")
+    parser.add_argument("--model", default=None, help="Model served when a request names none")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--threads", type=int, default=None, help="Inference threads per worker")
+    parser.add_argument("--max-in-flight", type=int, default=1024)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between memory reports")
+    args = parser.parse_args(argv)
+
+    # Load before forking so the model pages are shared; no predictions run here,
+    # since forking after the model libraries start their OpenMP pools is unsafe
+    registry = ModelRegistry().load_all()
+    # Drift histograms in memory the workers inherit shared, one slot per worker
+    drift_monitor = None
+    if os.path.exists(REFERENCE_PATH):
+        drift_monitor = DriftMonitor.load_reference(REFERENCE_PATH).share(args.workers)
+    # Keep the collector from touching (and so copying) the inherited objects
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    workers = [_spawn(sock, registry, args, threads, slot, drift_monitor) for slot in range(args.workers)]
+    print(f"Serving {len(registry.fnames)} models on http://{args.host}:{args.port} "
+          f"with {args.workers} workers x {threads} threads")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + min(5.0, args.report_interval)
+    while not stopping:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid and pid in workers and not stopping:
+            # Replace a crashed worker; it inherits the same shared pages and drift slot
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr)
+            slot = workers.index(pid)
+            workers[slot] = _spawn(sock, registry, args, threads, slot, drift_monitor)
+        if time.monotonic() >= next_report:
+            print(memory_report(os.getpid(), workers), flush=True)
+            next_report = time.monotonic() + args.report_interval
+        time.sleep(0.5)
+
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Feature preparation shared by the training script, the app and the batch jobs
+import functools
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import RobustScaler
+
+# Raw catalog columns the models never see
+UNUSED_COLUMNS = ['rowid', 'kepid', 'kepoi_name', 'kepler_name',
+                  'koi_pdisposition', 'koi_score', 'koi_tce_delivname',
+                  'koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec',
+                  'koi_tce_plnt_num', 'koi_teq_err1', 'koi_teq_err2']
+
+# Columns kept to identify rows in batch output
+ID_COLUMNS = ['rowid', 'kepid', 'kepoi_name']
+
+# Model inputs, in training order
+FEATURE_NAMES = [
+    "koi_period", "koi_period_err1", "koi_time0bk", "koi_time0bk_err1",
+    "koi_impact", "koi_impact_err1", "koi_impact_err2", "koi_duration",
+    "koi_duration_err1", "koi_depth", "koi_depth_err1", "koi_prad",
+    "koi_prad_err1", "koi_prad_err2", "koi_teq", "koi_insol",
+    "koi_insol_err1", "koi_model_snr", "koi_steff", "koi_steff_err1",
+    "koi_steff_err2", "koi_slogg", "koi_slogg_err1", "koi_slogg_err2",
+    "koi_srad_err1", "koi_srad_err2", "ra", "dec", "koi_kepmag",
+    "depth_to_srad", "prad_to_srad_ratio", "period_to_impact", "log_insol", "log_snr"
+]
+
+
+def add_engineered_features(df):
+    """Add the interaction features built in preprocess_inputs, in place."""
+    # Transit depth to stellar radius ratio
+    if 'koi_depth' in df.columns and 'koi_srad' in df.columns:
+        df['depth_to_srad'] = df['koi_depth'] / (df['koi_srad'] + 1e-10)
+
+    # Planet-star radius ratio
+    if 'koi_prad' in df.columns and 'koi_srad' in df.columns:
+        df['prad_to_srad_ratio'] = df['koi_prad'] / (df['koi_srad'] + 1e-10)
+
+    # Orbital period to impact parameter ratio
+    if 'koi_period' in df.columns and 'koi_impact' in df.columns:
+        df['period_to_impact'] = df['koi_period'] / (df['koi_impact'] + 1e-10)
+
+    # Insolation flux feature
+    if 'koi_insol' in df.columns:
+        df['log_insol'] = np.log1p(df['koi_insol'])
+
+    # Signal-to-noise ratio features
+    if 'koi_model_snr' in df.columns:
+        df['log_snr'] = np.log1p(df['koi_model_snr'])
+    return df
+
+
+def prepare_features(raw, scaler, feature_names=FEATURE_NAMES, impute=True):
+    """Turn raw catalog rows into the scaled feature frame the models were trained on.
+
+    Missing values are filled with the scaler's centre, which for RobustScaler
+    is the training median of each feature; with impute=False they stay NaN.
+    """
+    df = raw.drop(columns=[c for c in UNUSED_COLUMNS if c in raw.columns])
+    df = add_engineered_features(df)
+    X = df.reindex(columns=feature_names).astype(np.float64)
+    if impute:
+        X = X.fillna(pd.Series(scaler.center_, index=feature_names))
+    return pd.DataFrame(scaler.transform(X), index=X.index, columns=feature_names)
+
+
+class ExoplanetPreprocessor:
+    """Fitted form of preprocess_inputs.
+
+    Holds the IQR clip bounds, the per-column medians, the correlation drop list
+    and the RobustScaler, so raw catalog rows can be turned into model features
+    in one vectorized pass without recomputing any statistics.
+    """
+
+    def __init__(self, iqr_factor=3, corr_threshold=0.95, target='koi_disposition'):
+        self.iqr_factor = iqr_factor
+        self.corr_threshold = corr_threshold
+        self.target = target
+        self.scaler = None
+
+    def fit(self, df):
+        """Fit clip bounds, medians and the correlation filter on a raw catalog.
+
+        Every statistic is computed with whole-array NumPy operations, so the
+        cost grows with the size of the catalog and not with per-column Python
+        loops.
+        """
+        df = df.drop(columns=[c for c in UNUSED_COLUMNS if c in df.columns])
+        base = df.select_dtypes(include=[np.number]).drop(columns=[self.target], errors='ignore')
+        self.base_columns = base.columns.tolist()
+        values = base.to_numpy(dtype=np.float64, copy=True)
+        n_columns = values.shape[1]
+
+        # Handle outliers using IQR; columns without data are left unclipped
+        has_data = ~np.isnan(values).all(axis=0)
+        q1 = np.full(n_columns, np.nan)
+        q3 = np.full(n_columns, np.nan)
+        q1[has_data], q3[has_data] = np.nanquantile(values[:, has_data], [0.25, 0.75], axis=0)
+        iqr = q3 - q1
+        self.lower_ = np.where(has_data, q1 - self.iqr_factor * iqr, -np.inf)
+        self.upper_ = np.where(has_data, q3 + self.iqr_factor * iqr, np.inf)
+        np.clip(values, self.lower_, self.upper_, out=values)
+
+        # Medians are taken after clipping, as in preprocess_inputs
+        self.medians_ = np.full(n_columns, np.nan)
+        self.medians_[has_data] = np.nanmedian(values[:, has_data], axis=0)
+        values = np.where(np.isnan(values), self.medians_, values)
+        full = add_engineered_features(pd.DataFrame(values, columns=self.base_columns))
+
+        # Remove highly correlated features to eliminate multicollinearity: a column
+        # is dropped when it correlates above the threshold with any earlier column
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.abs(np.corrcoef(full.to_numpy(), rowvar=False))
+            drop = np.triu(corr > self.corr_threshold, k=1).any(axis=0)
+        self.dropped_columns_ = full.columns[drop].tolist()
+        self.feature_names = full.columns[~drop].tolist()
+        return self
+
+    def fit_scaler(self, X_train):
+        self.scaler = RobustScaler().fit(X_train)
+        return self
+
+    def transform_unscaled(self, df, impute=True):
+        """Clip, impute and engineer features for raw rows, before scaling.
+
+        With impute=False missing values stay NaN, as do the engineered
+        features built from them.
+        """
+        values = df.reindex(columns=self.base_columns).to_numpy(dtype=np.float64, copy=True)
+        np.clip(values, self.lower_, self.upper_, out=values)
+        if impute:
+            values = np.where(np.isnan(values), self.medians_, values)
+        base = pd.DataFrame(values, index=df.index, columns=self.base_columns)
+        return add_engineered_features(base)[self.feature_names]
+
+    def scale(self, X):
+        return pd.DataFrame(self.scaler.transform(X), index=X.index, columns=X.columns)
+
+    def transform(self, df, impute=True):
+        """Map raw catalog rows to the scaled features the models were trained on."""
+        return self.scale(self.transform_unscaled(df, impute))
+
+    def save(self, path='preprocessor.pkl'):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path='preprocessor.pkl'):
+        return joblib.load(path)
+
+
+def load_feature_transform(preprocessor_path='preprocessor.pkl', scaler_path='scaler.pkl'):
+    """Return a callable mapping raw catalog rows to scaled model features.
+
+    Without preprocessor.pkl (models exported by older versions of the
+    training script ship only scaler.pkl) this falls back to prepare_features,
+    which skips the IQR clipping and imputes with the scaler's centre, so the
+    features only approximate the training transform; a RuntimeWarning says so.
+    """
+    if os.path.exists(preprocessor_path):
+        return ExoplanetPreprocessor.load(preprocessor_path).transform
+    warnings.warn(f"{preprocessor_path} not found: raw rows are scaled with {scaler_path} without the training "
+                  f"outlier clipping or median imputation, so predictions can differ from the training transform; "
+                  f"rerun the training script to export {preprocessor_path}", RuntimeWarning, stacklevel=2)
+    return functools.partial(prepare_features, scaler=joblib.load(scaler_path))
+
+
+def prepare_training_data(df, iqr_factor=3, corr_threshold=0.95, train_size=0.7, random_state=1):
+    """Run the training preprocessing on a raw catalog.
+
+    Returns scaled X_train, X_test, y_train, y_test and the fitted
+    ExoplanetPreprocessor.
+    """
+    df = df.copy()
+
+    # Limit target values to CANDIDATE and CONFIRMED
+    false_positive_rows = df.query("koi_disposition == 'FALSE POSITIVE'").index
+    df = df.drop(false_positive_rows, axis=0).reset_index(drop=True)
+
+    # Fit the preprocessing statistics on the full catalog: unused columns are dropped,
+    # outliers clipped at iqr_factor*IQR, missing values filled with medians, interaction
+    # features added and features above corr_threshold correlation removed
+    preprocessor = ExoplanetPreprocessor(iqr_factor=iqr_factor, corr_threshold=corr_threshold).fit(df)
+
+    # Split df into X and y
+    y = df['koi_disposition']
+    X = preprocessor.transform_unscaled(df)
+
+    # Train-test split with stratification
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, train_size=train_size, shuffle=True, random_state=random_state, stratify=y
+    )
+
+    # Normalizing features
+    preprocessor.fit_scaler(X_train)
+    return preprocessor.scale(X_train), preprocessor.scale(X_test), y_train, y_test, preprocessor
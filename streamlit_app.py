@@ -1,4 +1,5 @@
 # Enhanced Exoplanet Classifier with Cosmic Theme
+import functools
 import os
 import streamlit as st
 import pandas as pd
@@ -6,6 +7,16 @@ import joblib
 import numpy as np
 import time
 
+from attribution import supports_tree_shap, tree_shap
+from drift import REFERENCE_PATH, DriftMonitor
+from exploration import SAMPLERS, marginal_curves, sensitivity_1d, sensitivity_2d, sweep
+from model_artifacts import MODEL_CANDIDATES, ModelRegistry, load_model_file
+from predictor import Predictor, ignore_feature_names_warning, predict_all_models
+from preprocessing import FEATURE_NAMES, ExoplanetPreprocessor, load_feature_transform
+from uncertainty import QUANTILES, propagate_scaled, summarize_draws
+
+ignore_feature_names_warning()
+
 # Page config
 st.set_page_config(
     page_title="🌌 Cosmic Exoplanet Classifier",
@@ -14,6 +25,34 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Server time of every full run and fragment rerun, for the debug panel
+page_started = time.perf_counter()
+DEBUG_HISTORY = 50
+
+def record_timing(section, started):
+    history = st.session_state.setdefault("debug_timings", [])
+    history.append({"section": section, "server_ms": round((time.perf_counter() - started) * 1e3, 2),
+                    "at": time.strftime("%H:%M:%S")})
+    del history[:-DEBUG_HISTORY]
+
+def timed_fragment(section):
+    """st.fragment that records the server time of each of its runs.
+
+    An interaction inside the fragment reruns only the fragment, not the
+    whole page with its CSS and the other widgets.
+    """
+    def decorate(func):
+        @st.fragment
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(section, started)
+        return wrapper
+    return decorate
+
 # Enhanced CSS with Advanced Animations and Better Styling
 st.markdown("""
 <style>
@@ -857,14 +896,11 @@ st.markdown("---")
 # Load Model Function
 @st.cache_resource
 def load_model():
-    model_files = ["best_model.pkl", "catboost.pkl", "model.pkl", "final_model.pkl"]
-    for fname in model_files:
+    for fname in MODEL_CANDIDATES:
         if os.path.exists(fname):
             try:
-                loaded = joblib.load(fname)
-                if isinstance(loaded, tuple) and len(loaded) == 2:
-                    return loaded[0], loaded[1], fname
-                return loaded, None, fname
+                loaded_model, loaded_features = load_model_file(fname)
+                return loaded_model, loaded_features, fname
             except Exception as e:
                 st.error(f"Error loading {fname}: {e}")
     return None, None, None
@@ -876,16 +912,7 @@ if model is None:
     st.stop()
 
 if feature_names is None:
-    feature_names = [
-        "koi_period","koi_period_err1","koi_time0bk","koi_time0bk_err1",
-        "koi_impact","koi_impact_err1","koi_impact_err2","koi_duration",
-        "koi_duration_err1","koi_depth","koi_depth_err1","koi_prad",
-        "koi_prad_err1","koi_prad_err2","koi_teq","koi_insol",
-        "koi_insol_err1","koi_model_snr","koi_steff","koi_steff_err1",
-        "koi_steff_err2","koi_slogg","koi_slogg_err1","koi_slogg_err2",
-        "koi_srad_err1","koi_srad_err2","ra","dec","koi_kepmag",
-        "depth_to_srad","prad_to_srad_ratio","period_to_impact","log_insol","log_snr"
-    ]
+    feature_names = FEATURE_NAMES
 
 st.success(f"✅ Model loaded successfully: {model_source}")
 
@@ -935,8 +962,10 @@ feature_groups = {
     ]
 }
 
-# Input Form with Enhanced UI and Randomize Buttons
-inputs = {}
+def current_inputs():
+    """Feature values of the input form, read from the widgets' session state."""
+    return {feature: float(st.session_state.get(feature, default))
+            for features in feature_groups.values() for feature, default, *_ in features}
 
 # Add CSS for randomize buttons
 st.markdown("""
@@ -966,7 +995,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-for group_name, features in feature_groups.items():
+@timed_fragment("feature group")
+def render_feature_group(group_name, features):
+    # The randomize buttons come before the inputs they change, so writing the
+    # session state is enough and no rerun is needed
     with st.expander(f"{group_name} ({len(features)} features)", expanded=True):
         # Add randomize all button for this group
         col1, col2, col3 = st.columns([1, 1, 1])
@@ -975,7 +1007,6 @@ for group_name, features in feature_groups.items():
                 for feature, default, label, description, min_val, max_val in features:
                     random_value = np.random.uniform(min_val, max_val)
                     st.session_state[feature] = random_value
-                st.rerun()
         
         cols = st.columns(3)
         for idx, (feature, default, label, description, min_val, max_val) in enumerate(features):
@@ -990,9 +1021,8 @@ for group_name, features in feature_groups.items():
                         if st.button("🎲", key=f"rand_{feature}", help=f"Randomize {label}"):
                             random_value = np.random.uniform(min_val, max_val)
                             st.session_state[feature] = random_value
-                            st.rerun()
                     
-                    inputs[feature] = st.number_input(
+                    st.number_input(
                         "",
                         value=st.session_state.get(feature, default),
                         min_value=float(min_val),
@@ -1003,106 +1033,515 @@ for group_name, features in feature_groups.items():
                         help=f"{description}\nRange: [{min_val:.3f}, {max_val:.3f}]"
                     )
 
+for group_name, features in feature_groups.items():
+    render_feature_group(group_name, features)
+
 st.markdown("---")
 
+# Input drift against the training data, shared by every session of this server
+@st.cache_resource
+def get_drift_monitor():
+    if not os.path.exists(REFERENCE_PATH):
+        return None
+    return DriftMonitor.load_reference(REFERENCE_PATH)
+
+def track_drift(X):
+    """Count scored inputs (a frame, or one row as a {feature: value} dict) into the drift monitor."""
+    monitor = get_drift_monitor()
+    if monitor is not None:
+        if isinstance(X, dict):
+            X = [[X.get(f, np.nan) for f in monitor.feature_names]]
+        monitor.update(X)
+
+# Tree SHAP attributions of one input, cached by model file and input values
+@st.cache_data(max_entries=256, show_spinner=False)
+def explain_input(model_key, input_items):
+    x = dict(input_items)
+    contributions, base_values = tree_shap(model, [[x.get(f, 0.0) for f in feature_names]])
+    return pd.Series(contributions[0], index=feature_names), float(base_values[0])
+
+def session_predictor():
+    """This session's Predictor, built once so its input buffer is reused across clicks.
+
+    A session's reruns run one at a time, so its Predictor is never shared
+    between threads.
+    """
+    stored = st.session_state.get("predictor")
+    if stored is None or stored[0] != model_source:
+        stored = st.session_state["predictor"] = (model_source, Predictor(model, feature_names))
+    return stored[1]
+
 # Enhanced Predict Button
-if st.button("🔮 Classify Exoplanet", key="predict_button"):
-    with st.spinner("🌌 Analyzing planetary data..."):
-        # Add cosmic loading animation
-        st.markdown("""
-        <div style="text-align: center; margin: 2rem 0;">
-            <div class="cosmic-loader"></div>
-            <p style="color: #94a3b8; margin-top: 1rem;">Scanning the cosmos for planetary signatures...</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        time.sleep(1)  # Add dramatic pause
+@timed_fragment("prediction panel")
+def prediction_panel():
+    inputs = current_inputs()
+    if st.button("🔮 Classify Exoplanet", key="predict_button"):
+        with st.spinner("🌌 Analyzing planetary data..."):
+            # Add cosmic loading animation
+            st.markdown("""
+            <div style="text-align: center; margin: 2rem 0;">
+                <div class="cosmic-loader"></div>
+                <p style="color: #94a3b8; margin-top: 1rem;">Scanning the cosmos for planetary signatures...</p>
+            </div>
+            """, unsafe_allow_html=True)
         
-        try:
-            X_new = pd.DataFrame([inputs])
-            X_new = X_new.reindex(columns=feature_names, fill_value=0)
-            
-            pred = model.predict(X_new)
-            proba = model.predict_proba(X_new) if hasattr(model, "predict_proba") else None
-            
-            prediction = pred[0] if hasattr(pred, "_len_") else pred
+            try:
+                if hasattr(model, "predict_proba"):
+                    # One predict_proba call gives both the label and the probabilities
+                    prediction, proba_row = session_predictor().predict(inputs)
+                    track_drift(inputs)
+                    proba = proba_row[np.newaxis]
+                else:
+                    X_new = pd.DataFrame([inputs]).reindex(columns=feature_names, fill_value=0)
+                    prediction = model.predict(X_new)[0]
+                    proba = None
             
-            if prediction == 1 or str(prediction).upper() == "CONFIRMED":
-                st.markdown("""
-                <div class="success-box">
-                    <h2 style="color: #22c55e; margin: 0 0 1rem 0; font-size: 3rem; animation: successBounce 1s ease-in-out;">✅ CONFIRMED EXOPLANET</h2>
-                    <p style="font-size: 1.4rem; color: #22c55e; margin: 0; animation: textGlow 2s ease-in-out infinite;">
-                        🌟 This object shows strong evidence of being an exoplanet! 🌟
-                    </p>
-                    <p style="color: #16a34a; margin: 1rem 0 0 0; font-size: 1.2rem;">
-                        The planetary signature has been detected with high confidence.
-                    </p>
-                    <div style="margin-top: 2rem;">
-                        <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(34, 197, 94, 0.2); border-radius: 20px; color: #22c55e; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite;">
-                            🪐 Planetary Signal Detected
-                        </div>
-                        <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(16, 185, 129, 0.2); border-radius: 20px; color: #10b981; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite 0.5s;">
-                            🌟 High Confidence
+                if prediction == 1 or str(prediction).upper() == "CONFIRMED":
+                    st.markdown("""
+                    <div class="success-box">
+                        <h2 style="color: #22c55e; margin: 0 0 1rem 0; font-size: 3rem; animation: successBounce 1s ease-in-out;">✅ CONFIRMED EXOPLANET</h2>
+                        <p style="font-size: 1.4rem; color: #22c55e; margin: 0; animation: textGlow 2s ease-in-out infinite;">
+                            🌟 This object shows strong evidence of being an exoplanet! 🌟
+                        </p>
+                        <p style="color: #16a34a; margin: 1rem 0 0 0; font-size: 1.2rem;">
+                            The planetary signature has been detected with high confidence.
+                        </p>
+                        <div style="margin-top: 2rem;">
+                            <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(34, 197, 94, 0.2); border-radius: 20px; color: #22c55e; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite;">
+                                🪐 Planetary Signal Detected
+                            </div>
+                            <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(16, 185, 129, 0.2); border-radius: 20px; color: #10b981; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite 0.5s;">
+                                🌟 High Confidence
+                            </div>
                         </div>
                     </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""
-                <div class="error-box">
-                    <h2 style="color: #ef4444; margin: 0 0 1rem 0; font-size: 3rem; animation: errorShake 1s ease-in-out;">❌ FALSE POSITIVE</h2>
-                    <p style="font-size: 1.4rem; color: #ef4444; margin: 0; animation: textGlowRed 2s ease-in-out infinite;">
-                        🔍 This object is likely not an exoplanet
-                    </p>
-                    <p style="color: #dc2626; margin: 1rem 0 0 0; font-size: 1.2rem;">
-                        The signal appears to be caused by other astronomical phenomena.
-                    </p>
-                    <div style="margin-top: 2rem;">
-                        <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(239, 68, 68, 0.2); border-radius: 20px; color: #ef4444; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite;">
-                            ⚠️ No Planetary Signal
-                        </div>
-                        <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(220, 38, 38, 0.2); border-radius: 20px; color: #dc2626; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite 0.5s;">
-                            🔬 Further Analysis Needed
+                    """, unsafe_allow_html=True)
+                else:
+                    st.markdown("""
+                    <div class="error-box">
+                        <h2 style="color: #ef4444; margin: 0 0 1rem 0; font-size: 3rem; animation: errorShake 1s ease-in-out;">❌ FALSE POSITIVE</h2>
+                        <p style="font-size: 1.4rem; color: #ef4444; margin: 0; animation: textGlowRed 2s ease-in-out infinite;">
+                            🔍 This object is likely not an exoplanet
+                        </p>
+                        <p style="color: #dc2626; margin: 1rem 0 0 0; font-size: 1.2rem;">
+                            The signal appears to be caused by other astronomical phenomena.
+                        </p>
+                        <div style="margin-top: 2rem;">
+                            <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(239, 68, 68, 0.2); border-radius: 20px; color: #ef4444; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite;">
+                                ⚠️ No Planetary Signal
+                            </div>
+                            <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(220, 38, 38, 0.2); border-radius: 20px; color: #dc2626; font-weight: 600; margin: 0 0.5rem; animation: badgeFloat 3s ease-in-out infinite 0.5s;">
+                                🔬 Further Analysis Needed
+                            </div>
                         </div>
                     </div>
-                </div>
-                """, unsafe_allow_html=True)
+                    """, unsafe_allow_html=True)
             
-            if proba is not None:
-                st.markdown("### 📊 Prediction Confidence Analysis")
-                proba_values = proba[0].tolist() if hasattr(proba[0], "tolist") else proba[0]
+                if proba is not None:
+                    st.markdown("### 📊 Prediction Confidence Analysis")
+                    proba_values = proba[0].tolist() if hasattr(proba[0], "tolist") else proba[0]
                 
-                conf_col1, conf_col2 = st.columns(2)
-                with conf_col1:
-                    st.markdown(f"""
-                    <div class="confidence-metric">
-                        <h4 style="color: #ef4444; margin: 0 0 0.5rem 0;">❌ False Positive</h4>
-                        <h3 style="color: #e2e8f0; margin: 0; font-size: 2rem;">{proba_values[0]:.1%}</h3>
-                        <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Probability</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    conf_col1, conf_col2 = st.columns(2)
+                    with conf_col1:
+                        st.markdown(f"""
+                        <div class="confidence-metric">
+                            <h4 style="color: #ef4444; margin: 0 0 0.5rem 0;">❌ False Positive</h4>
+                            <h3 style="color: #e2e8f0; margin: 0; font-size: 2rem;">{proba_values[0]:.1%}</h3>
+                            <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Probability</p>
+                        </div>
+                        """, unsafe_allow_html=True)
                     
-                with conf_col2:
-                    st.markdown(f"""
-                    <div class="confidence-metric">
-                        <h4 style="color: #22c55e; margin: 0 0 0.5rem 0;">✅ Confirmed</h4>
-                        <h3 style="color: #e2e8f0; margin: 0; font-size: 2rem;">{proba_values[1]:.1%}</h3>
-                        <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Probability</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    with conf_col2:
+                        st.markdown(f"""
+                        <div class="confidence-metric">
+                            <h4 style="color: #22c55e; margin: 0 0 0.5rem 0;">✅ Confirmed</h4>
+                            <h3 style="color: #e2e8f0; margin: 0; font-size: 2rem;">{proba_values[1]:.1%}</h3>
+                            <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Probability</p>
+                        </div>
+                        """, unsafe_allow_html=True)
                 
-                # Add confidence visualization
-                st.markdown("### 🎯 Confidence Visualization")
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    st.progress(proba_values[1])
-                    st.caption(f"Model Confidence: {max(proba_values):.1%}")
+                    # Add confidence visualization
+                    st.markdown("### 🎯 Confidence Visualization")
+                    col1, col2, col3 = st.columns([1, 2, 1])
+                    with col2:
+                        st.progress(proba_values[1])
+                        st.caption(f"Model Confidence: {max(proba_values):.1%}")
+
+                    if supports_tree_shap(model):
+                        st.markdown("### 🧭 Why This Prediction")
+                        contributions, base_value = explain_input(model_source, tuple(sorted(inputs.items())))
+                        top = contributions.reindex(contributions.abs().sort_values(ascending=False).index[:10])
+                        st.bar_chart(top.rename("contribution (log-odds towards Confirmed)"))
+                        st.caption(f"Tree SHAP: base log-odds {base_value:.3f}, plus the contributions of all "
+                                   f"{len(contributions)} features gives {base_value + contributions.sum():.3f}. "
+                                   f"Showing the 10 largest.")
                     
+            except Exception as e:
+                st.error(f"❌ Prediction Error: {e}")
+                st.write("Debug Info:")
+                st.write("Input features:", len(inputs))
+                st.write("Expected features:", len(feature_names))
+
+prediction_panel()
+
+# What-if sensitivity of the current input to one or two features
+FEATURE_RANGES = {feature: (min_val, max_val)
+                  for features in feature_groups.values() for feature, _, _, _, min_val, max_val in features}
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def what_if_curve(model_key, input_items, feature, n_points):
+    # Keyed by model file, input and feature; the app's second class is "Confirmed"
+    return sensitivity_1d(model, feature_names, dict(input_items), feature, FEATURE_RANGES[feature],
+                          n_points=n_points, pos_label=model.classes_[1])
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def what_if_heatmap(model_key, input_items, feature_x, feature_y, n_points):
+    return sensitivity_2d(model, feature_names, dict(input_items), feature_x, FEATURE_RANGES[feature_x],
+                          feature_y, FEATURE_RANGES[feature_y], n_points=n_points, pos_label=model.classes_[1])
+
+st.markdown("---")
+st.markdown("### 🔍 What-If Analysis")
+st.caption("See how the CONFIRMED probability of the current input changes as one feature, or two together, move across their range.")
+
+@timed_fragment("what-if analysis")
+def what_if_panel():
+    if not hasattr(model, "predict_proba"):
+        st.info("The loaded model does not support probability scoring")
+        return
+    features = list(FEATURE_RANGES)
+    wi_col1, wi_col2, wi_col3 = st.columns(3)
+    with wi_col1:
+        feature_x = st.selectbox("Feature", features, index=features.index("koi_model_snr"), key="what_if_x")
+    with wi_col2:
+        feature_y = st.selectbox("Second feature (heatmap)", ["(none)"] + features, key="what_if_y")
+    with wi_col3:
+        n_points = st.select_slider("Grid points per feature", options=[20, 50, 100, 200], value=50,
+                                    key="what_if_points")
+    # Editing an input reruns only its feature group, not this fragment, so the
+    # grid is scored on demand from the inputs as they are at the click
+    if not st.button("🔍 Compute What-If", key="what_if_button"):
+        return
+
+    input_items = tuple(sorted(current_inputs().items()))
+    started = time.perf_counter()
+    if feature_y in ("(none)", feature_x):
+        grid, scores = what_if_curve(model_source, input_items, feature_x, n_points)
+        st.line_chart(pd.DataFrame({"CONFIRMED probability": scores}, index=np.round(grid, 4)))
+    else:
+        grid_x, grid_y, scores = what_if_heatmap(model_source, input_items, feature_x, feature_y, n_points)
+        # One rect per grid point, spanning half a step on each side
+        half_x, half_y = (grid_x[1] - grid_x[0]) / 2, (grid_y[1] - grid_y[0]) / 2
+        xs, ys = np.tile(grid_x, len(grid_y)), np.repeat(grid_y, len(grid_x))
+        cells = pd.DataFrame({"x": xs - half_x, "x2": xs + half_x, "y": ys - half_y, "y2": ys + half_y,
+                              "probability": scores.ravel()})
+        st.vega_lite_chart(cells, {
+            "mark": "rect",
+            "encoding": {
+                "x": {"field": "x", "type": "quantitative", "title": feature_x},
+                "x2": {"field": "x2"},
+                "y": {"field": "y", "type": "quantitative", "title": feature_y},
+                "y2": {"field": "y2"},
+                "color": {"field": "probability", "type": "quantitative", "scale": {"domain": [0, 1]},
+                          "title": "CONFIRMED"},
+            },
+        }, use_container_width=True)
+    st.caption(f"Grid scored in {(time.perf_counter() - started) * 1e3:.1f} ms "
+               f"(one predict_proba call, cached per model, input and features)")
+
+what_if_panel()
+
+# Measurement-error propagation for the current input
+@st.cache_resource
+def load_scaler():
+    # The scaler that produced the form's scaled values, needed to unscale the error bars
+    if os.path.exists("preprocessor.pkl"):
+        return ExoplanetPreprocessor.load("preprocessor.pkl").scaler
+    if os.path.exists("scaler.pkl"):
+        return joblib.load("scaler.pkl")
+    return None
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def uncertainty_draws(model_key, input_items, draws, seed):
+    return propagate_scaled(model, dict(input_items), feature_names, load_scaler(), draws=draws, seed=seed)
+
+st.markdown("---")
+st.markdown("### 📏 Measurement Uncertainty")
+st.caption("Redraw every measurement within its err1/err2 error bars and score all draws at once to get a probability interval instead of a single value.")
+
+@timed_fragment("measurement uncertainty")
+def uncertainty_panel():
+    if not hasattr(model, "predict_proba") or load_scaler() is None:
+        st.info("Needs a probability model and preprocessor.pkl or scaler.pkl to unscale the error bars")
+        return
+    unc_col1, unc_col2 = st.columns(2)
+    with unc_col1:
+        draws = st.select_slider("Monte Carlo draws", options=[100, 1_000, 10_000, 100_000], value=1_000,
+                                 key="uncertainty_draws")
+    with unc_col2:
+        seed = int(st.number_input("Seed", value=0, step=1, key="uncertainty_seed"))
+    if not st.button("📏 Propagate Uncertainty", key="uncertainty_button"):
+        return
+
+    started = time.perf_counter()
+    scores = uncertainty_draws(model_source, tuple(sorted(current_inputs().items())), draws, seed)
+    elapsed = time.perf_counter() - started
+    summary = {k: float(v[0]) for k, v in summarize_draws(scores[np.newaxis]).items()}
+    low, high = (f"p{round(q * 100):02d}" for q in (QUANTILES[0], QUANTILES[-1]))
+    stat_col1, stat_col2, stat_col3 = st.columns(3)
+    stat_col1.metric("Mean CONFIRMED probability", f"{summary['mean']:.1%}")
+    stat_col2.metric(f"{round((QUANTILES[-1] - QUANTILES[0]) * 100)}% interval",
+                     f"{summary[low]:.1%} – {summary[high]:.1%}")
+    stat_col3.metric("Draws classified CONFIRMED", f"{(scores > 0.5).mean():.1%}")
+    counts, edges = np.histogram(scores, bins=40, range=(0.0, 1.0))
+    st.bar_chart(pd.DataFrame({"draws": counts}, index=np.round((edges[:-1] + edges[1:]) / 2, 3)))
+    st.caption(f"{draws:,} draws scored in {elapsed * 1e3:.1f} ms")
+
+uncertainty_panel()
+
+# Compare every shipped model on the current input
+@st.cache_resource
+def get_model_registry():
+    # Models are loaded lazily on first comparison and cached across sessions
+    return ModelRegistry()
+
+st.markdown("---")
+st.markdown("### 🛰️ Compare All Models")
+st.caption("Score the current input on every trained model in parallel and check whether they agree.")
+
+@timed_fragment("model comparison")
+def comparison_panel():
+    if st.button("🛰️ Compare All Models", key="compare_button"):
+        registry = get_model_registry()
+        started = time.perf_counter()
+        comparison = pd.DataFrame(predict_all_models(registry, current_inputs()))
+        wall_ms = (time.perf_counter() - started) * 1e3
+
+        if "latency_ms" in comparison:
+            st.write(f"Scored {len(comparison)} models in {wall_ms:.1f} ms wall-clock "
+                     f"(sum of per-model latencies: {comparison['latency_ms'].sum():.1f} ms)")
+        if "prediction" in comparison:
+            votes = comparison["prediction"].value_counts()
+            st.write("Model votes:", ", ".join(f"{label}: {count}" for label, count in votes.items()))
+        st.dataframe(comparison, use_container_width=True)
+
+comparison_panel()
+
+# Monte Carlo sweep over the feature ranges of the form
+@st.cache_data(max_entries=4, show_spinner=False)
+def run_sweep(model_key, n_samples, method, seed):
+    """Summary of a sweep: probability histogram, statistics and per-feature marginals.
+
+    Only these few-kB summaries are cached and kept in session state; the
+    samples themselves (up to 1M x 34 floats) are dropped as soon as they
+    are summarised.
+    """
+    # model_key (the model file) stands in for the unhashable model object
+    # The app reads the second class as "Confirmed", see the confidence panel
+    samples, scores = sweep(model, feature_names, FEATURE_RANGES, n_samples, method=method,
+                            pos_label=model.classes_[1], seed=seed)
+    counts, edges = np.histogram(scores, bins=50, range=(0.0, 1.0))
+    return {
+        "n": len(scores),
+        "mean": float(scores.mean()),
+        "confirmed": float((scores > 0.5).mean()),
+        "median": float(np.median(scores)),
+        "histogram": (counts, edges),
+        "curves": marginal_curves(samples, scores, FEATURE_RANGES),
+    }
+
+st.markdown("---")
+st.markdown("### 🎛️ Monte Carlo Sweep")
+st.caption("Sample many inputs from the feature ranges above and score them all in one batch to see how the model's CONFIRMED probability is distributed.")
+
+@timed_fragment("monte carlo sweep")
+def sweep_panel():
+    if not hasattr(model, "predict_proba"):
+        st.info("The loaded model does not support probability scoring")
+        return
+    sweep_col1, sweep_col2, sweep_col3 = st.columns(3)
+    with sweep_col1:
+        n_samples = st.select_slider("Samples", options=[1_000, 10_000, 100_000, 300_000, 1_000_000],
+                                     value=100_000, key="sweep_samples")
+    with sweep_col2:
+        method = st.radio("Sampling", list(SAMPLERS), horizontal=True, key="sweep_method")
+    with sweep_col3:
+        seed = int(st.number_input("Seed", value=0, step=1, key="sweep_seed"))
+
+    if st.button("🎛️ Run Sweep", key="sweep_button"):
+        started = time.perf_counter()
+        summary = run_sweep(model_source, n_samples, method, seed)
+        elapsed = time.perf_counter() - started
+        st.session_state["sweep_results"] = (summary, elapsed)
+
+    stored = st.session_state.get("sweep_results")
+    if stored is None:
+        return
+    summary, elapsed = stored
+    st.success(f"✅ Scored {summary['n']:,} samples in {elapsed:.2f}s")
+    stat_col1, stat_col2, stat_col3 = st.columns(3)
+    stat_col1.metric("Mean CONFIRMED probability", f"{summary['mean']:.1%}")
+    stat_col2.metric("Classified CONFIRMED", f"{summary['confirmed']:.1%}")
+    stat_col3.metric("Median", f"{summary['median']:.1%}")
+
+    counts, edges = summary["histogram"]
+    st.markdown("#### CONFIRMED probability distribution")
+    st.bar_chart(pd.DataFrame({"samples": counts}, index=np.round((edges[:-1] + edges[1:]) / 2, 3)))
+
+    # Features ranked by how far their marginal mean probability moves over their range
+    curves = summary["curves"]
+    spread = pd.Series({f: np.nanmax(mean) - np.nanmin(mean) for f, (_, mean) in curves.items()})
+    spread = spread.sort_values(ascending=False)
+    st.markdown("#### Per-feature marginals")
+    feature = st.selectbox("Feature", list(spread.index), key="sweep_feature",
+                           format_func=lambda f: f"{f} (spread {spread[f]:.1%})")
+    centers, mean = curves[feature]
+    st.line_chart(pd.DataFrame({"mean CONFIRMED probability": mean}, index=np.round(centers, 4)))
+
+sweep_panel()
+
+# Bulk Classification from an uploaded catalog
+BULK_CHUNK_SIZE = 50_000
+
+def read_uploaded_catalog(uploaded):
+    """Parse an uploaded file once per session; fragment reruns reuse the frame."""
+    upload_key = (uploaded.name, uploaded.size)
+    stored = st.session_state.get("bulk_catalog")
+    if stored is not None and stored[0] == upload_key:
+        return stored[1]
+    if uploaded.name.lower().endswith(".parquet"):
+        catalog = pd.read_parquet(uploaded)
+    else:
+        catalog = pd.read_csv(uploaded)
+    st.session_state["bulk_catalog"] = (upload_key, catalog)
+    return catalog
+
+@st.cache_resource
+def load_raw_transform():
+    return load_feature_transform()
+
+def score_catalog(df, progress_callback=None, raw_values=False, attributions=False):
+    """Score every row of df, one predict_proba call per BULK_CHUNK_SIZE rows.
+
+    With attributions, tree SHAP values are added as shap_<feature> columns.
+    """
+    transform = load_raw_transform() if raw_values else None
+    X = transform(df) if raw_values else df
+    # Imputed per chunk, after the drift monitor has counted the missing values
+    X = X.reindex(columns=feature_names)
+    n_rows = len(X)
+    classes = list(model.classes_)
+    proba = np.empty((n_rows, len(classes)), dtype=np.float64)
+    shap = np.empty((n_rows, len(feature_names)), dtype=np.float64) if attributions else None
+    for start in range(0, n_rows, BULK_CHUNK_SIZE):
+        stop = min(start + BULK_CHUNK_SIZE, n_rows)
+        if not raw_values:
+            track_drift(X.iloc[start:stop])
+        elif get_drift_monitor() is not None:
+            # The raw transform imputes, so the drift counts come from an unimputed pass
+            track_drift(transform(df.iloc[start:stop], impute=False))
+        chunk = X.iloc[start:stop].fillna(0)
+        proba[start:stop] = model.predict_proba(chunk)
+        if attributions:
+            shap[start:stop] = tree_shap(model, chunk)[0]
+        if progress_callback is not None:
+            progress_callback(stop / n_rows)
+
+    results = df.copy()
+    results["prediction"] = np.asarray(classes, dtype=object)[proba.argmax(axis=1)]
+    for idx, cls in enumerate(classes):
+        results[f"prob_{cls}"] = proba[:, idx]
+    if attributions:
+        for idx, name in enumerate(feature_names):
+            results[f"shap_{name}"] = shap[:, idx]
+    return results
+
+st.markdown("---")
+st.markdown("### 📂 Bulk Classification")
+st.caption("Upload a CSV or Parquet file with one row per object and the model feature columns to classify the whole catalog at once.")
+
+@timed_fragment("bulk classification")
+def bulk_panel():
+    uploaded_catalog = st.file_uploader("Catalog file", type=["csv", "parquet"], key="bulk_upload")
+    raw_values = st.checkbox("File contains raw catalog values (cumulative.csv schema) – apply the training preprocessing",
+                             key="bulk_raw_values")
+    if raw_values and not os.path.exists("preprocessor.pkl"):
+        st.warning("⚠️ preprocessor.pkl not found: raw values are only scaled with scaler.pkl, without the training "
+                   "outlier clipping and median imputation, so predictions can differ from the training pipeline. "
+                   "Rerun the training script to export it.")
+    attributions = supports_tree_shap(model) and st.checkbox(
+        "Add tree SHAP feature attributions (shap_<feature> columns)", key="bulk_attributions")
+    if uploaded_catalog is not None:
+        catalog_key = (uploaded_catalog.name, uploaded_catalog.size, raw_values, attributions)
+        try:
+            catalog = read_uploaded_catalog(uploaded_catalog)
         except Exception as e:
-            st.error(f"❌ Prediction Error: {e}")
-            st.write("Debug Info:")
-            st.write("Input shape:", X_new.shape)
-            st.write("Expected features:", len(feature_names))
+            st.error(f"❌ Could not read {uploaded_catalog.name}: {e}")
+            catalog = None
+
+        if catalog is not None:
+            missing = [] if raw_values else [f for f in feature_names if f not in catalog.columns]
+            if missing:
+                st.error(f"❌ Missing {len(missing)} feature column(s): {', '.join(missing)}")
+            elif not hasattr(model, "predict_proba"):
+                st.error("❌ The loaded model does not support probability scoring")
+            else:
+                st.write(f"Loaded {len(catalog):,} rows from {uploaded_catalog.name}")
+                if st.button("🔭 Classify Catalog", key="bulk_predict_button"):
+                    progress = st.progress(0.0)
+                    started = time.perf_counter()
+                    results = score_catalog(catalog, progress_callback=progress.progress, raw_values=raw_values,
+                                            attributions=attributions)
+                    elapsed = time.perf_counter() - started
+                    # Only what the reruns display is kept, with the CSV serialized once here
+                    st.session_state["bulk_results"] = (
+                        catalog_key, len(results), elapsed, results["prediction"].value_counts().rename("count"),
+                        results.head(100), results.to_csv(index=False).encode("utf-8"))
+
+                stored = st.session_state.get("bulk_results")
+                if stored is not None and stored[0] == catalog_key:
+                    _, n_results, elapsed, counts, head, csv_bytes = stored
+                    st.success(f"✅ Classified {n_results:,} rows in {elapsed:.2f}s")
+                    st.dataframe(counts)
+                    st.dataframe(head)
+                    st.download_button(
+                        "⬇️ Download predictions (CSV)",
+                        data=csv_bytes,
+                        file_name="exoplanet_predictions.csv",
+                        mime="text/csv",
+                        key="bulk_download",
+                    )
+
+bulk_panel()
+
+# Drift of everything scored through the app against the training inputs
+st.markdown("---")
+st.markdown("### 📉 Input Drift")
+st.caption("Inputs classified here and in bulk are binned into the training data's quantile bins; PSI and KS show which features drift from the training distribution.")
+
+@timed_fragment("input drift")
+def drift_panel():
+    monitor = get_drift_monitor()
+    if monitor is None:
+        st.info(f"No {REFERENCE_PATH} found; it is exported by the training script")
+        return
+    drift_col1, drift_col2 = st.columns(2)
+    with drift_col1:
+        st.button("🔄 Refresh", key="drift_refresh")
+    with drift_col2:
+        # The monitor is shared by every session, so a reset only moves this session's baseline
+        if st.button("🧹 Reset Counts", key="drift_reset"):
+            st.session_state["drift_since"] = monitor.snapshot()
+    report = monitor.report(since=st.session_state.get("drift_since"))
+    n_rows = report.attrs["n_rows"]
+    st.write(f"{n_rows:,} rows monitored")
+    if "drift_since" in st.session_state:
+        st.caption("Counted since this session's last reset; other sessions still see all rows.")
+    if n_rows:
+        counts = report["status"].value_counts()
+        st.write(", ".join(f"{status}: {count}" for status, count in counts.items()))
+        st.dataframe(report, use_container_width=True)
+
+drift_panel()
 
 # Enhanced Footer
 st.markdown("---")
@@ -1149,3 +1588,18 @@ st.markdown("""
 }
 </style>
 """, unsafe_allow_html=True)
+
+# Debug panel: server time per interaction. Full runs re-execute the whole
+# script, fragment runs only the section that was interacted with
+record_timing("full page", page_started)
+
+@st.fragment
+def debug_panel():
+    with st.expander("🛠️ Debug: server time per interaction"):
+        st.button("Refresh", key="debug_refresh")
+        history = st.session_state.get("debug_timings", [])
+        if history:
+            st.dataframe(pd.DataFrame(history[::-1]), use_container_width=True)
+
+with st.sidebar:
+    debug_panel()
@@ -0,0 +1,136 @@
+# Training helpers used by Model_Training_Notebook.py
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+from threadpoolctl import threadpool_limits
+
+from model_artifacts import artifact_stem, export_native_artifact, limit_model_threads
+
+
+def model_filename(name):
+    return name.strip().replace(" ", "_").lower() + ".pkl"
+
+
+def best_params_path(name):
+    """Where hyperparameter_search.py stores the best configuration of a model."""
+    return model_filename(name)[:-len(".pkl")] + ".best_params.json"
+
+
+def apply_best_params(models):
+    """Set the tuned parameters of every model that has a saved search result.
+
+    The searched estimator's full parameters are applied when saved, so the
+    model is trained exactly as it was scored, not just with the sampled keys.
+    """
+    for name, model in models.items():
+        path = best_params_path(name)
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            model.set_params(**saved.get("estimator_params", saved["params"]))
+            print(f"{name.strip()}: using tuned parameters from {path}")
+    return models
+
+
+def fingerprint_path(name):
+    return model_filename(name)[:-len(".pkl")] + ".fingerprint.json"
+
+
+def library_versions():
+    import catboost, lightgbm, numpy, pandas, sklearn
+    return {"python": platform.python_version(), "numpy": numpy.__version__, "pandas": pandas.__version__,
+            "scikit-learn": sklearn.__version__, "lightgbm": lightgbm.__version__,
+            "catboost": catboost.__version__}
+
+
+def model_fingerprint(model, data_hash):
+    """Hash of everything a fitted model depends on: estimator, parameters, training data and libraries."""
+    details = {
+        "estimator": f"{type(model).__module__}.{type(model).__qualname__}",
+        "params": {k: repr(v) for k, v in sorted(model.get_params(deep=False).items())},
+        "data": data_hash,
+        "versions": library_versions(),
+    }
+    return hashlib.sha256(json.dumps(details, sort_keys=True).encode()).hexdigest(), details
+
+
+def is_up_to_date(name, fingerprint):
+    """True when the model's .pkl exists and was trained with the same fingerprint."""
+    path = fingerprint_path(name)
+    if not (os.path.exists(model_filename(name)) and os.path.exists(path)):
+        return False
+    with open(path) as f:
+        return json.load(f).get("fingerprint") == fingerprint
+
+
+def _fit_and_save(name, model, X_train, y_train, n_threads, fingerprint):
+    limit_model_threads(model, n_threads)
+    started = time.perf_counter()
+    # Also cap BLAS/OpenMP pools used by numpy-backed models (MLP, LDA, QDA, ...)
+    with threadpool_limits(limits=n_threads):
+        model.fit(X_train, y_train)
+    elapsed = time.perf_counter() - started
+    filename = model_filename(name)
+    joblib.dump(model, filename)
+    # Native / memory-mappable copy for serving, see model_artifacts.py
+    export_native_artifact(model, artifact_stem(filename))
+    # Written last, so an interrupted run never marks a model as up to date
+    with open(fingerprint_path(name), "w") as f:
+        json.dump({"fingerprint": fingerprint[0], **fingerprint[1]}, f, indent=2)
+    return name, model, filename, elapsed
+
+
+def train_models_parallel(models, X_train, y_train, n_jobs=None, skip_unchanged=True):
+    """Fit every model of the dict concurrently in a process pool.
+
+    With skip_unchanged, a model whose stored fingerprint (data hash,
+    estimator parameters, library versions) matches is loaded from its .pkl
+    instead of refit. Returns the models and the names that were refit.
+
+    The cores are split evenly between the worker processes and each model's
+    internal thread count is capped to its share, so cores are not
+    oversubscribed. Each model is pickled (and exported to artifacts/) by its
+    worker as soon as its fit finishes, and the fitted models replace the
+    entries of ``models``.
+    """
+    data_hash = joblib.hash((X_train, y_train))
+    to_train = {}
+    for name, model in models.items():
+        fingerprint = model_fingerprint(model, data_hash)
+        if skip_unchanged and is_up_to_date(name, fingerprint[0]):
+            models[name] = joblib.load(model_filename(name))
+            print(f"{name} unchanged, loaded from {model_filename(name)}")
+        else:
+            to_train[name] = (model, fingerprint)
+    if not to_train:
+        return models, []
+
+    def collect(name, model, filename, elapsed):
+        models[name] = model
+        print(f"{name} trained in {elapsed:.1f}s.")
+        print(f"Saved {name} to {filename}")
+
+    n_cores = os.cpu_count() or 1
+    # The training script calls this from top-level code without a __main__
+    # guard, so workers must be forked: spawn/forkserver children re-import the
+    # script and fail. Without fork (Windows) the models are trained in turn.
+    if "fork" not in multiprocessing.get_all_start_methods():
+        for name, (model, fingerprint) in to_train.items():
+            collect(*_fit_and_save(name, model, X_train, y_train, n_cores, fingerprint))
+        return models, list(to_train)
+
+    n_workers = max(1, min(n_jobs or n_cores, len(to_train)))
+    n_threads = max(1, n_cores // n_workers)
+
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        futures = [pool.submit(_fit_and_save, name, model, X_train, y_train, n_threads, fingerprint)
+                   for name, (model, fingerprint) in to_train.items()]
+        for future in as_completed(futures):
+            collect(*future.result())
+    return models, list(to_train)
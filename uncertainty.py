@@ -0,0 +1,134 @@
+# Monte Carlo propagation of the catalog's measurement errors to the model output
+#
+# Every base measurement with error columns (koi_period with koi_period_err1 /
+# koi_period_err2, ...) is redrawn M times per object from a split normal whose
+# upper and lower widths are the +err1 and |err2| error bars. All draws of a
+# chunk of objects are scored in one predict_proba call, and each object gets
+# the mean, spread and quantiles of its probability across draws.
+#
+# propagate_catalog works on raw catalog rows, so the preprocessing (clipping,
+# imputation, engineered features, scaling) is rerun on every draw.
+# propagate_scaled works on one row of already scaled model features, as the
+# app's form holds: it unscales the row, perturbs it and updates the
+# engineered features that depend on the perturbed measurements.
+import numpy as np
+import pandas as pd
+
+# Base measurement -> (upper error column, lower error column)
+MEASUREMENT_ERRORS = {
+    name: (f"{name}_err1", f"{name}_err2")
+    for name in ["koi_period", "koi_time0bk", "koi_impact", "koi_duration", "koi_depth",
+                 "koi_prad", "koi_insol", "koi_steff", "koi_slogg", "koi_srad"]
+}
+
+# Rows scored per predict_proba call (objects per chunk x draws)
+MAX_ROWS_PER_CALL = 200_000
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+def split_normal_offsets(upper, lower, draws, rng):
+    """draws offsets per object from a split normal with widths upper (+) and lower (-).
+
+    upper and lower are arrays of n_objects error bars; missing bars give no
+    offset. Returns an n_objects x draws array.
+    """
+    upper = np.nan_to_num(np.abs(np.asarray(upper, dtype=np.float64)))
+    lower = np.nan_to_num(np.abs(np.asarray(lower, dtype=np.float64)))
+    z = rng.standard_normal((len(upper), draws))
+    return np.where(z >= 0, z * upper[:, None], z * lower[:, None])
+
+
+def summarize_draws(scores, quantiles=QUANTILES):
+    """Mean, standard deviation and quantiles of an n_objects x draws score matrix."""
+    summary = {"mean": scores.mean(axis=1), "std": scores.std(axis=1)}
+    for q, values in zip(quantiles, np.quantile(scores, quantiles, axis=1)):
+        summary[f"p{round(q * 100):02d}"] = values
+    return summary
+
+
+def _pos_index(model, pos_label):
+    classes = list(model.classes_)
+    # The second class is the app's "Confirmed"
+    return classes.index(pos_label) if pos_label is not None else 1
+
+
+def propagate_catalog(model, transform, raw, feature_names, draws=200, seed=None, pos_label=None,
+                      max_rows=MAX_ROWS_PER_CALL):
+    """Probability intervals for raw catalog rows under their measurement errors.
+
+    transform maps raw rows to scaled features (see load_feature_transform).
+    Objects are processed max_rows // draws at a time, so memory stays bounded
+    for any catalog size. Returns a frame indexed like raw with the summary
+    columns of summarize_draws.
+    """
+    rng = np.random.default_rng(seed)
+    pos_index = _pos_index(model, pos_label)
+    present = {base: errs for base, errs in MEASUREMENT_ERRORS.items() if base in raw.columns}
+    per_call = max(1, max_rows // draws)
+    parts = []
+    for start in range(0, len(raw), per_call):
+        chunk = raw.iloc[start:start + per_call]
+        perturbed = chunk.loc[chunk.index.repeat(draws)].reset_index(drop=True)
+        for base, (err1, err2) in present.items():
+            upper = chunk[err1].to_numpy() if err1 in chunk.columns else np.zeros(len(chunk))
+            lower = chunk[err2].to_numpy() if err2 in chunk.columns else upper
+            perturbed[base] = perturbed[base].to_numpy(dtype=np.float64) + \
+                split_normal_offsets(upper, lower, draws, rng).ravel()
+        X = transform(perturbed).reindex(columns=feature_names, fill_value=0).fillna(0)
+        scores = model.predict_proba(X)[:, pos_index].reshape(len(chunk), draws)
+        parts.append(pd.DataFrame(summarize_draws(scores), index=chunk.index))
+    return pd.concat(parts) if parts else pd.DataFrame(index=raw.index)
+
+
+def _update_engineered(X, X0, columns):
+    """Recompute the engineered features of unscaled draws X from their measurements.
+
+    The stellar radius is not a model input, so the ratios to it are updated
+    in proportion to their numerators (see add_engineered_features).
+    """
+    idx = {name: i for i, name in enumerate(columns)}
+
+    def ratio(name):
+        old = X0[idx[name]]
+        return X[:, idx[name]] / old if old else np.ones(len(X))
+
+    if "log_insol" in idx and "koi_insol" in idx:
+        X[:, idx["log_insol"]] = np.log1p(np.maximum(X[:, idx["koi_insol"]], -1 + 1e-10))
+    if "depth_to_srad" in idx and "koi_depth" in idx:
+        X[:, idx["depth_to_srad"]] = X0[idx["depth_to_srad"]] * ratio("koi_depth")
+    if "prad_to_srad_ratio" in idx and "koi_prad" in idx:
+        X[:, idx["prad_to_srad_ratio"]] = X0[idx["prad_to_srad_ratio"]] * ratio("koi_prad")
+    if {"period_to_impact", "koi_period", "koi_impact"} <= idx.keys():
+        impact0 = X0[idx["koi_impact"]] + 1e-10
+        X[:, idx["period_to_impact"]] = (X0[idx["period_to_impact"]] * ratio("koi_period")
+                                         * impact0 / (X[:, idx["koi_impact"]] + 1e-10))
+    return X
+
+
+def propagate_scaled(model, x, feature_names, scaler, draws=1000, seed=None, pos_label=None):
+    """Probability draws for one row of scaled features x ({feature: value}).
+
+    The row is unscaled with the fitted RobustScaler, its measurements are
+    perturbed within their (unscaled) error features, the engineered features
+    are updated and all draws are rescaled and scored in one predict_proba
+    call. Returns the draws x 1 vector of probabilities.
+    """
+    columns = list(getattr(scaler, "feature_names_in_", feature_names))
+    row = np.array([x.get(f, 0.0) for f in columns], dtype=np.float64)
+    unscaled = row * scaler.scale_ + scaler.center_
+    idx = {name: i for i, name in enumerate(columns)}
+
+    rng = np.random.default_rng(seed)
+    X = np.tile(unscaled, (draws, 1))
+    for base, (err1, err2) in MEASUREMENT_ERRORS.items():
+        if base not in idx or err1 not in idx:
+            continue
+        upper = unscaled[idx[err1]]
+        lower = unscaled[idx[err2]] if err2 in idx else upper
+        X[:, idx[base]] += split_normal_offsets([upper], [lower], draws, rng)[0]
+    X = _update_engineered(X, unscaled, columns)
+
+    scaled = pd.DataFrame((X - scaler.center_) / scaler.scale_, columns=columns)
+    scaled = scaled.reindex(columns=feature_names, fill_value=0)
+    return model.predict_proba(scaled.to_numpy())[:, _pos_index(model, pos_label)]